@@ -0,0 +1,93 @@
+"""
+Worker pool with AIMD (additive increase, multiplicative decrease) concurrency.
+
+Used for Gemini post-processing: the pool starts small, lets one more call in
+flight per healthy round trip, and halves its limit as soon as the upstream
+answers with a 429 / quota error. Results keep the input order and carry the
+latency of each call.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def is_quota_error(error):
+    """True for 429 / quota-exhausted errors from Gemini or an HTTP upstream"""
+    if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+        return True
+    if type(error).__name__ in ('ResourceExhausted', 'TooManyRequests'):
+        return True
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'rate limit' in message
+
+
+class AdaptiveConcurrencyPool:
+    def __init__(self, name, initial=2, minimum=1, maximum=8, latency_target=20.0, is_overload=is_quota_error):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.is_overload = is_overload
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=maximum, thread_name_prefix=f"festifly-{name}")
+        self.metrics = {"calls": 0, "errors": 0, "overloads": 0, "latency_seconds": 0.0, "max_latency_seconds": 0.0}
+
+    def _acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def _release(self, started, latency, error):
+        with self.cond:
+            self.in_flight -= 1
+            self.metrics["calls"] += 1
+            self.metrics["latency_seconds"] += latency
+            self.metrics["max_latency_seconds"] = max(self.metrics["max_latency_seconds"], latency)
+
+            if error is not None and self.is_overload(error):
+                self.metrics["overloads"] += 1
+                # Cut once per congestion event: calls started before the last cut saw the old limit
+                if started > self.last_decrease:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = time.monotonic()
+            elif error is not None:
+                self.metrics["errors"] += 1
+            elif latency <= self.latency_target:
+                # +1/limit per success is roughly +1 per full round of in-flight calls
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self.cond.notify_all()
+
+    def _run(self, fn, item):
+        self._acquire()
+        started = time.monotonic()
+        result, error = None, None
+        try:
+            result = fn(item)
+        except Exception as e:
+            error = e
+        latency = time.monotonic() - started
+        self._release(started, latency, error)
+        return {"result": result, "error": error, "latency": latency}
+
+    def map(self, fn, items):
+        """
+        Call fn(item) for every item under the adaptive limit.
+
+        Returns {"result", "error", "latency"} dicts in the same order as `items`.
+        """
+        futures = [self.executor.submit(self._run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        with self.cond:
+            metrics = dict(self.metrics)
+            metrics["concurrency_limit"] = round(self.limit, 2)
+            metrics["in_flight"] = self.in_flight
+        metrics["latency_seconds"] = round(metrics["latency_seconds"], 3)
+        metrics["max_latency_seconds"] = round(metrics["max_latency_seconds"], 3)
+        return metrics
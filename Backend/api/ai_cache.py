@@ -0,0 +1,102 @@
+"""
+Persistent, content-addressed cache for AI-normalized events.
+
+The key is a SHA-256 over everything that goes into the normalization prompt
+(the whitespace-normalized raw event, the search context and PROMPT_VERSION),
+so an unchanged listing card never goes through Gemini twice. Entries live in
+MongoDB and expire through a TTL index.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+# Bump whenever the normalization prompt or its output format changes
+PROMPT_VERSION = "event-normalize-v1"
+RAW_EVENT_FIELDS = ['title', 'content', 'location', 'date_info', 'url', 'source']
+
+
+def _normalize_text(value):
+    return " ".join(str(value or "").split())
+
+
+def event_cache_key(raw_event, location, month, interests):
+    payload = {
+        "prompt_version": PROMPT_VERSION,
+        "event": {field: _normalize_text(raw_event.get(field)) for field in RAW_EVENT_FIELDS},
+        "location": _normalize_text(location).lower(),
+        "month": _normalize_text(month).lower(),
+        "interests": sorted(_normalize_text(i).lower() for i in interests or []),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class NormalizedEventCache:
+    def __init__(self, collection, ttl_days=30):
+        self.collection = collection
+        self.ttl_seconds = int(ttl_days * 86400)
+        self.lock = threading.Lock()
+        self.indexes_ready = False
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _count(self, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                self.metrics[key] += value
+
+    def _ensure_indexes(self):
+        if self.indexes_ready:
+            return
+        self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        self.indexes_ready = True
+
+    def get_many(self, keys):
+        """
+        Look up cached results. Returns {key: result}, where result is the normalized
+        event dict or None for events the AI chose to skip.
+        """
+        unique_keys = list(set(keys))
+        found = {}
+        try:
+            for doc in self.collection.find({"_id": {"$in": unique_keys}}, {"result": 1}):
+                found[doc["_id"]] = doc.get("result")
+        except PyMongoError as e:
+            print(f"AI cache lookup failed: {e}")
+            self._count(errors=1)
+            found = {}
+
+        hits = sum(1 for key in keys if key in found)
+        self._count(hits=hits, misses=len(keys) - hits)
+        return found
+
+    def put_many(self, results):
+        """Store {key: result} pairs; result None records a skip decision"""
+        if not results:
+            return
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                {"$set": {"result": result, "prompt_version": PROMPT_VERSION, "created_at": now}},
+                upsert=True,
+            )
+            for key, result in results.items()
+        ]
+        try:
+            self._ensure_indexes()
+            self.collection.bulk_write(operations, ordered=False)
+            self._count(writes=len(operations))
+        except PyMongoError as e:
+            print(f"AI cache write failed: {e}")
+            self._count(errors=1)
+
+    def stats(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 3) if lookups else None
+        return metrics
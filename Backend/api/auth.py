@@ -0,0 +1,254 @@
+"""
+Bearer-token authentication, once per request.
+
+JWTAuthenticationMiddleware decodes the Authorization header and resolves the
+user or organizer it names into a Principal on request.principal. Views call
+authenticate() instead of parsing the header themselves, so a page that hits
+verify_token, user_profile and subscription_status reads MongoDB at most once.
+
+Resolved principals are cached per process, keyed by token, for
+FESTIFLY_PRINCIPAL_CACHE_SECONDS (never past the token's own expiry).
+Views that change a cached account call invalidate_principal(); other
+worker processes see the change once their entry expires. Short-lived
+access tokens (api/tokens.py) are resolved from their claims alone; the
+account document is only read if a view asks for it.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from bson import ObjectId
+from django.http import JsonResponse
+from pymongo.errors import PyMongoError
+
+from .cache import LRUCache
+from .db import get_db
+
+SECRET_KEY = os.environ.get('FESTIFLY_SECRET_KEY', 'FetiFly')
+
+PRINCIPAL_CACHE_SECONDS = float(os.environ.get('FESTIFLY_PRINCIPAL_CACHE_SECONDS', 60))
+PRINCIPAL_CACHE_ENTRIES = int(os.environ.get('FESTIFLY_PRINCIPAL_CACHE_ENTRIES', 10000))
+
+# "typ" claim of the tokens minted by api/tokens.py
+ACCESS_TOKEN_TYPE = "access"
+
+# Token claim holding the account id, and the collection it refers to, per principal kind
+ACCOUNT_KINDS = {
+    "user": ("user_id", "users"),
+    "organizer": ("organizer_id", "organizers"),
+}
+
+
+@dataclass
+class Principal:
+    kind: str                       # "user" or "organizer"
+    id: str
+    username: str = None
+    email: str = None
+    claims: dict = field(default_factory=dict)
+    # The account document without its password; shared with other requests, so read-only.
+    # None until first use for principals resolved from an access token.
+    document: dict = None
+
+    @property
+    def stateless(self):
+        """True when resolved from a short-lived access token, without reading MongoDB"""
+        return self.claims.get("typ") == ACCESS_TOKEN_TYPE
+
+    @property
+    def account(self):
+        if self.document is None:
+            self.document = load_account(self.kind, self.id) or {}
+        return self.document
+
+
+class AuthenticationFailed(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class PrincipalCache:
+    """
+    LRUCache of token -> principal, plus a generation counter per account:
+    invalidate() bumps it, and entries filled under an older generation are
+    ignored, so every token of that account is dropped at once.
+    """
+
+    def __init__(self, ttl_seconds=PRINCIPAL_CACHE_SECONDS, max_entries=PRINCIPAL_CACHE_ENTRIES):
+        self.entries = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.invalidations = 0
+
+    def generation(self, account_id):
+        with self.lock:
+            return self.generations.get(account_id, 0)
+
+    def get(self, token):
+        entry = self.entries.get(token)
+        if entry is None:
+            return None
+        principal, generation, expires = entry
+        if generation != self.generation(principal.id) or (expires is not None and time.time() >= expires):
+            self.entries.delete(token)
+            return None
+        return principal
+
+    def set(self, token, principal, generation):
+        expires = principal.claims.get("exp")
+        self.entries.set(token, (principal, generation, expires if isinstance(expires, (int, float)) else None))
+
+    def invalidate(self, account_id):
+        with self.lock:
+            self.generations[account_id] = self.generations.get(account_id, 0) + 1
+            self.invalidations += 1
+
+    def stats(self):
+        metrics = self.entries.stats()
+        metrics["invalidations"] = self.invalidations
+        return metrics
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(account_id):
+    """Drop cached principals for a user or organizer id after changing their document"""
+    if account_id:
+        principal_cache.invalidate(str(account_id))
+
+
+def bearer_token(request):
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    return auth_header[len('Bearer '):].strip() or None
+
+
+def load_account(kind, account_id):
+    _, collection = ACCOUNT_KINDS[kind]
+    return get_db()[collection].find_one({"_id": ObjectId(account_id)}, {"password": 0})
+
+
+def resolve_principal(token):
+    """Principal for a token, from the cache or MongoDB; raises AuthenticationFailed"""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationFailed("Token expired")
+    except jwt.InvalidTokenError as e:
+        raise AuthenticationFailed(f"Invalid token: {e}")
+
+    for kind, (claim, _) in ACCOUNT_KINDS.items():
+        if claims.get(claim):
+            break
+    else:
+        raise AuthenticationFailed("Invalid token payload")
+
+    account_id = str(claims[claim])
+    if not ObjectId.is_valid(account_id):
+        raise AuthenticationFailed("Invalid token payload")
+    if claims.get("typ") == ACCESS_TOKEN_TYPE:
+        # Signed and short-lived: trusted as is, and cheaper to decode again than to cache
+        return Principal(kind=kind, id=account_id, username=claims.get("username"),
+                         email=claims.get("email"), claims=claims)
+
+    # Read the generation before the document, so an invalidation in between discards this entry
+    generation = principal_cache.generation(account_id)
+    account = load_account(kind, account_id)
+    if not account:
+        raise AuthenticationFailed(f"{kind.capitalize()} not found", status=404)
+
+    principal = Principal(
+        kind=kind,
+        id=account_id,
+        username=account.get("username"),
+        email=account.get("email"),
+        claims=claims,
+        document=account,
+    )
+    principal_cache.set(token, principal, generation)
+    return principal
+
+
+class JWTAuthenticationMiddleware:
+    """
+    Sets request.principal (None for anonymous or failed requests) and
+    request.auth_error ((message, status) or None). Never rejects a request
+    itself: public views ignore both, protected views call authenticate().
+    Works in both sync and async stacks; under ASGI, a token that needs a
+    MongoDB lookup is resolved on a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self.authenticate(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if bearer_token(request) is None:
+            self.authenticate(request)
+        else:
+            await sync_to_async(self.authenticate, thread_sensitive=False)(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def authenticate(request):
+        request.principal = None
+        request.auth_error = None
+
+        token = bearer_token(request)
+        if token is None:
+            request.auth_error = ("No token provided", 401)
+            return
+        try:
+            request.principal = resolve_principal(token)
+        except AuthenticationFailed as e:
+            request.auth_error = (e.message, e.status)
+        except PyMongoError as e:
+            print(f"Authentication lookup failed: {e}")
+            request.auth_error = ("Authentication temporarily unavailable", 503)
+
+
+def authenticate(request, kind="user", require_account=False, **extra):
+    """
+    (principal, None) for a request authenticated as `kind`, else (None, error
+    response). `extra` is merged into the error body. Views that read
+    principal.account pass require_account: an access token can outlive its
+    account, and is then answered 404 like a session token would be.
+    """
+    principal = getattr(request, "principal", None)
+    if principal is not None and principal.kind == kind:
+        if not require_account:
+            return principal, None
+        try:
+            if principal.account:
+                return principal, None
+        except PyMongoError as e:
+            print(f"Account lookup failed: {e}")
+            return None, JsonResponse({**extra, "error": "Authentication temporarily unavailable"}, status=503)
+        return None, JsonResponse({**extra, "error": f"{kind.capitalize()} not found"}, status=404)
+
+    if principal is not None:
+        message, status = f"Invalid token: not a {kind} token", 401
+    else:
+        message, status = getattr(request, "auth_error", None) or ("No token provided", 401)
+    return None, JsonResponse({**extra, "error": message}, status=status)
@@ -0,0 +1,276 @@
+"""
+Caches for recommendation results.
+
+LRUCache is the in-process cache: LRU eviction in O(1) on an OrderedDict,
+capped by both entry count and an approximate byte budget. Entries expire
+lazily: an expired entry is dropped when it is next read or when it reaches
+the LRU end, so no request ever pays for a full sweep.
+
+MongoCacheBackend and FileCacheBackend share results across worker processes
+and restarts. All three expose get/get_entry/set/delete/stats, are picked with
+build_cache_backend(), and expect keys from stable_key(), which unlike hash()
+is the same in every process. get_entry() also returns the entry's age, so
+callers can serve a stale entry while they refresh it.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+
+def estimate_size(value):
+    """Approximate footprint of a JSON-like value, in bytes of its JSON encoding"""
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+class LRUCache:
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl_seconds=1800):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (value, size, stored_at)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def get_entry(self, key):
+        """
+        (value, age_seconds) or None on a miss.
+        Values are shared between callers: treat them as read-only.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.metrics["misses"] += 1
+                return None
+
+            value, _, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age >= self.ttl_seconds:
+                self._drop(key)
+                self.metrics["expirations"] += 1
+                self.metrics["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return value, age
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        size = estimate_size(value)
+        with self.lock:
+            if size > self.max_bytes:
+                self.metrics["rejected"] += 1
+                return False
+
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            self.metrics["sets"] += 1
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest_key, (_, _, stored_at) = next(iter(self.entries.items()))
+                self._drop(oldest_key)
+                if time.monotonic() - stored_at >= self.ttl_seconds:
+                    self.metrics["expirations"] += 1
+                else:
+                    self.metrics["evictions"] += 1
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+
+    def stats(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics["entries"] = len(self.entries)
+            metrics["bytes"] = self.total_bytes
+        metrics["max_entries"] = self.max_entries
+        metrics["max_bytes"] = self.max_bytes
+        metrics["backend"] = "memory"
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 3) if lookups else None
+        return metrics
+
+
+def stable_key(payload):
+    """Process-independent cache key: SHA-256 of the canonical JSON encoding of `payload`"""
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _BackendMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "sets": 0, "errors": 0}
+
+    def count(self, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                self.metrics[key] += value
+
+    def stats(self, **extra):
+        with self.lock:
+            metrics = dict(self.metrics)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 3) if lookups else None
+        metrics.update(extra)
+        return metrics
+
+
+class MongoCacheBackend:
+    """Entries in a MongoDB collection, removed by a TTL index on expires_at"""
+
+    def __init__(self, collection, ttl_seconds=1800):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.indexes_ready = False
+        self.metrics = _BackendMetrics()
+
+    def _ensure_indexes(self):
+        if self.indexes_ready:
+            return
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.indexes_ready = True
+
+    def get_entry(self, key):
+        now = datetime.utcnow()
+        try:
+            # The TTL monitor only runs every minute, so check expiry here too
+            doc = self.collection.find_one({"_id": key, "expires_at": {"$gt": now}}, {"value": 1, "stored_at": 1})
+        except PyMongoError as e:
+            print(f"Cache backend read failed: {e}")
+            self.metrics.count(errors=1, misses=1)
+            return None
+
+        if doc is None:
+            self.metrics.count(misses=1)
+            return None
+        self.metrics.count(hits=1)
+        return doc["value"], max(0.0, (now - doc["stored_at"]).total_seconds())
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        now = datetime.utcnow()
+        try:
+            self._ensure_indexes()
+            self.collection.replace_one(
+                {"_id": key},
+                {"value": value, "stored_at": now, "expires_at": now + timedelta(seconds=self.ttl_seconds)},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            print(f"Cache backend write failed: {e}")
+            self.metrics.count(errors=1)
+            return False
+        self.metrics.count(sets=1)
+        return True
+
+    def delete(self, key):
+        try:
+            self.collection.delete_one({"_id": key})
+        except PyMongoError as e:
+            print(f"Cache backend delete failed: {e}")
+            self.metrics.count(errors=1)
+
+    def stats(self):
+        return self.metrics.stats(backend="mongo")
+
+
+class FileCacheBackend:
+    """One pickle file per key in a directory shared by every worker on the host"""
+
+    def __init__(self, directory, ttl_seconds=1800):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.metrics = _BackendMetrics()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get_entry(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_at, value = pickle.load(f)
+        except FileNotFoundError:
+            self.metrics.count(misses=1)
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            print(f"Cache backend read failed: {e}")
+            self.metrics.count(errors=1, misses=1)
+            return None
+
+        age = time.time() - stored_at
+        if age >= self.ttl_seconds:
+            self.delete(key)
+            self.metrics.count(misses=1)
+            return None
+        self.metrics.count(hits=1)
+        return value, max(0.0, age)
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        tmp_path = None
+        try:
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Cache backend write failed: {e}")
+            self.metrics.count(errors=1)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.metrics.count(sets=1)
+        return True
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Cache backend delete failed: {e}")
+            self.metrics.count(errors=1)
+
+    def stats(self):
+        return self.metrics.stats(backend="file")
+
+
+def build_cache_backend(kind, ttl_seconds, collection=None, directory=None, max_entries=256, max_bytes=32 * 1024 * 1024):
+    """Cache backend for `kind` ("memory", "mongo" or "file")"""
+    if kind == "mongo":
+        return MongoCacheBackend(collection, ttl_seconds=ttl_seconds)
+    if kind == "file":
+        return FileCacheBackend(directory, ttl_seconds=ttl_seconds)
+    if kind == "memory":
+        return LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown cache backend: {kind}")
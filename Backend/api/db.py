@@ -0,0 +1,62 @@
+"""
+Shared MongoDB access.
+
+Every module gets its collections from here, so a worker process holds a
+single MongoClient (and a single connection pool) no matter how many view
+modules it imports. The client is created on first use from settings.MONGODB.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from pymongo import MongoClient
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _write_concern(value):
+    # "majority" stays a string, "1" means one acknowledging node
+    return int(value) if str(value).isdigit() else value
+
+
+def get_client():
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            config = settings.MONGODB
+            if not config.get("URI"):
+                raise ImproperlyConfigured("FESTIFLY_MONGODB_URI environment variable not set!")
+            _client = MongoClient(
+                config["URI"],
+                maxPoolSize=config["MAX_POOL_SIZE"],
+                minPoolSize=config["MIN_POOL_SIZE"],
+                maxIdleTimeMS=config["MAX_IDLE_TIME_MS"],
+                waitQueueTimeoutMS=config["WAIT_QUEUE_TIMEOUT_MS"],
+                connectTimeoutMS=config["CONNECT_TIMEOUT_MS"],
+                serverSelectionTimeoutMS=config["SERVER_SELECTION_TIMEOUT_MS"],
+                socketTimeoutMS=config["SOCKET_TIMEOUT_MS"],
+                readPreference=config["READ_PREFERENCE"],
+                readConcernLevel=config["READ_CONCERN"],
+                w=_write_concern(config["WRITE_CONCERN"]),
+                retryWrites=config["RETRY_WRITES"],
+                appname="festifly",
+            )
+    return _client
+
+
+def get_db():
+    return get_client()[settings.MONGODB["NAME"]]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+async def run_db(fn, *args, **kwargs):
+    """Await a blocking pymongo call from an async view, on a worker thread"""
+    return await sync_to_async(fn, thread_sensitive=False)(*args, **kwargs)
@@ -0,0 +1,100 @@
+"""
+Idempotent persistence for scraped festivals.
+
+Every festival gets a fingerprint (SHA-256 over its canonical title, URL,
+location and month) backed by a unique index, and is upserted with
+$setOnInsert: storing the same festival again returns the existing _id
+instead of writing a duplicate document.
+
+Fingerprints are taken from the fields as scraped. normalize_festival()
+rewrites month ("Dec" -> "December", or fills it in from date_info), so
+callers fingerprint before normalizing; a stored document's fingerprint
+can't be recomputed from its (normalized) fields.
+"""
+import hashlib
+import json
+from urllib.parse import urlsplit
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _canonical_text(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def _canonical_url(url):
+    parts = urlsplit(str(url or "").strip())
+    if not parts.netloc:
+        return _canonical_text(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+def festival_fingerprint(festival):
+    payload = {
+        "title": _canonical_text(festival.get("title")),
+        "url": _canonical_url(festival.get("url")),
+        "location": _canonical_text(festival.get("location")),
+        "month": _canonical_text(festival.get("month")),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class FestivalStore:
+    def __init__(self, collection):
+        self.collection = collection
+        self.indexes_ready = False
+
+    def _ensure_indexes(self):
+        if self.indexes_ready:
+            return
+        # Partial, so organizer-created festivals (no fingerprint) are unaffected
+        self.collection.create_index(
+            "fingerprint",
+            unique=True,
+            partialFilterExpression={"fingerprint": {"$exists": True}},
+        )
+        self.indexes_ready = True
+
+    def upsert_many(self, festivals):
+        """
+        Store festivals that aren't stored yet. Sets "fingerprint" on each dict that
+        doesn't carry one and returns their _id strings in the same order;
+        already-stored festivals keep their original document untouched.
+        """
+        if not festivals:
+            return []
+
+        for festival in festivals:
+            if not festival.get("fingerprint"):
+                festival["fingerprint"] = festival_fingerprint(festival)
+
+        operations = [
+            UpdateOne(
+                {"fingerprint": festival["fingerprint"]},
+                {"$setOnInsert": {k: v for k, v in festival.items() if k != "_id"}},
+                upsert=True,
+            )
+            for festival in festivals
+        ]
+
+        self._ensure_indexes()
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent upsert of the same festival won the race; its document is just as good
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+                raise
+
+        fingerprints = list({festival["fingerprint"] for festival in festivals})
+        ids = {
+            doc["fingerprint"]: str(doc["_id"])
+            for doc in self.collection.find({"fingerprint": {"$in": fingerprints}}, {"fingerprint": 1})
+        }
+        return [ids.get(festival["fingerprint"]) for festival in festivals]
@@ -0,0 +1,133 @@
+"""
+Bounded-concurrency fetch engine for the festival scraper.
+
+All listing/detail URLs are submitted to a thread pool at once, while a
+per-host semaphore and token bucket keep us polite towards each individual
+site. Every job is timed, with rate-limiter waits reported separately, so
+callers can see which source is holding up a request and why; scrapes
+record their per-source timings in `source_timings` for /api/metrics/.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from . import http_client
+from .ratelimit import rate_limiter
+
+# Upper bound on concurrent jobs for one fan-out
+MAX_WORKERS = int(os.environ.get('FESTIFLY_SCRAPER_MAX_WORKERS', 16))
+# Max concurrent requests against a single host
+PER_HOST_LIMIT = int(os.environ.get('FESTIFLY_SCRAPER_PER_HOST_LIMIT', 2))
+
+_host_semaphores = {}
+_host_lock = threading.Lock()
+# Rate-limiter wait accumulated by the job currently running on this thread
+_throttle = threading.local()
+
+
+def _host_semaphore(url):
+    host = urlparse(url).netloc.lower()
+    with _host_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+
+def polite_get(url, **kwargs):
+    """Pooled GET that respects the host's concurrency limit and token bucket"""
+    waited = rate_limiter.acquire_host(url)
+    _throttle.seconds = getattr(_throttle, 'seconds', 0.0) + waited
+    with _host_semaphore(url):
+        return http_client.get("scraper", url, **kwargs)
+
+
+def run_concurrently(jobs, max_workers=MAX_WORKERS):
+    """
+    Run (key, fn) jobs on a bounded thread pool.
+
+    Returns one dict per job, in the same order as `jobs`:
+    {"key": key, "result": ..., "error": str or None, "elapsed": seconds,
+     "throttled": seconds of `elapsed` spent waiting on the rate limiter}
+    """
+    if not jobs:
+        return []
+
+    def timed(key, fn):
+        _throttle.seconds = 0.0
+        started = time.perf_counter()
+        outcome = {"key": key, "result": None, "error": None}
+        try:
+            outcome["result"] = fn()
+        except Exception as e:
+            outcome["error"] = str(e)
+        outcome["elapsed"] = time.perf_counter() - started
+        outcome["throttled"] = _throttle.seconds
+        return outcome
+
+    workers = max(1, min(max_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="festifly-fetch") as pool:
+        futures = [pool.submit(timed, key, fn) for key, fn in jobs]
+        return [future.result() for future in futures]
+
+
+def summarize_timings(outcomes, group_of=lambda key: key):
+    """
+    Aggregate job outcomes into per-group timing stats.
+
+    Jobs in one group ran in parallel, so a group's wall time is its slowest job.
+    """
+    summary = {}
+    for outcome in outcomes:
+        group = group_of(outcome["key"])
+        stats = summary.setdefault(group, {"jobs": 0, "errors": 0, "elapsed": 0.0, "throttled": 0.0})
+        stats["jobs"] += 1
+        if outcome["error"]:
+            stats["errors"] += 1
+        stats["elapsed"] = round(max(stats["elapsed"], outcome["elapsed"]), 3)
+        stats["throttled"] = round(stats["throttled"] + outcome["throttled"], 3)
+    return summary
+
+
+class SourceTimings:
+    """
+    Per-source timings of the scrapes this worker ran: the last run and running
+    totals for each phase ("listing", "detail"), as reported by summarize_timings().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sources = {}
+
+    def record(self, phases):
+        """`phases`: {phase: summarize_timings() output} for one scrape"""
+        with self.lock:
+            for phase, timings in phases.items():
+                for source, stats in timings.items():
+                    totals = self.sources.setdefault(source, {}).setdefault(phase, {
+                        "runs": 0, "jobs": 0, "errors": 0, "elapsed": 0.0, "throttled": 0.0, "max_elapsed": 0.0,
+                    })
+                    totals["runs"] += 1
+                    totals["jobs"] += stats["jobs"]
+                    totals["errors"] += stats["errors"]
+                    totals["elapsed"] += stats["elapsed"]
+                    totals["throttled"] += stats["throttled"]
+                    totals["max_elapsed"] = max(totals["max_elapsed"], stats["elapsed"])
+                    totals["last"] = dict(stats)
+
+    def stats(self):
+        with self.lock:
+            return {
+                source: {
+                    phase: {
+                        key: round(value, 3) if isinstance(value, float) else dict(value) if isinstance(value, dict) else value
+                        for key, value in totals.items()
+                    }
+                    for phase, totals in phases.items()
+                }
+                for source, phases in self.sources.items()
+            }
+
+
+source_timings = SourceTimings()
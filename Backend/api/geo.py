@@ -0,0 +1,72 @@
+"""
+Offline geocoding against the bundled gazetteer (api/data/gazetteer.json).
+
+Festivals get a GeoJSON point in `geo` when they are stored; with the
+2dsphere index on it, "festivals within 50 km" is one indexed query.
+Matching is by city name or alias. Locations are written venue, city,
+country, so the comma-separated parts are tried right to left ("Rock in
+Rio, Lisbon" -> Lisbon); within a part the longest phrase wins ("New Delhi"
+before "Delhi"), then the rightmost. Aliases that are also common words or
+festival names ("rio", "tomorrowland") are left out of the gazetteer.
+"""
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.json")
+MAX_PHRASE_WORDS = 4
+
+
+def normalize_place(text):
+    """Lowercase ASCII without accents; punctuation other than commas becomes spaces"""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9,]+", " ", text.lower()).split())
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer():
+    """({city id: city}, {normalized name or alias: city id})"""
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        cities = json.load(f)
+    by_id = {city["id"]: city for city in cities}
+    lookup = {}
+    for city in cities:
+        for name in [city["name"], *city.get("aliases", [])]:
+            lookup.setdefault(normalize_place(name), city["id"])
+    return by_id, lookup
+
+
+def find_city(location):
+    """Gazetteer entry for a free-text location, or None"""
+    by_id, lookup = load_gazetteer()
+    for part in reversed(normalize_place(location).split(",")):
+        words = part.split()
+        for size in range(min(MAX_PHRASE_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                city_id = lookup.get(" ".join(words[start:start + size]))
+                if city_id:
+                    return by_id[city_id]
+    return None
+
+
+def geo_point(lng, lat):
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def geocode(location):
+    """GeoJSON point for a free-text location, or None if it isn't in the gazetteer"""
+    city = find_city(location)
+    if city is None:
+        return None
+    return geo_point(city["lng"], city["lat"])
+
+
+def bbox_polygon(min_lng, min_lat, max_lng, max_lat):
+    return {
+        "type": "Polygon",
+        "coordinates": [[
+            [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat],
+        ]],
+    }
@@ -0,0 +1,131 @@
+"""
+Shared outbound HTTP client.
+
+One keep-alive requests.Session per upstream service, so repeat calls reuse
+pooled TCP/TLS connections instead of paying the handshake every time. Each
+service has a default (connect, read) timeout so a hung upstream can't pin a
+worker, and transient failures get a bounded number of retries with jittered
+exponential backoff.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Per-service defaults. `timeout` is (connect, read) seconds.
+SERVICES = {
+    "scraper": {"timeout": (5, 20), "retries": 1, "pool_maxsize": 32},
+    "reddit": {"timeout": (5, 10), "retries": 2, "pool_maxsize": 10},
+    "google_translate": {"timeout": (5, 15), "retries": 2, "pool_maxsize": 10},
+    "elevenlabs": {"timeout": (5, 60), "retries": 1, "pool_maxsize": 10},
+    "tavus": {"timeout": (5, 30), "retries": 2, "pool_maxsize": 10},
+}
+DEFAULT_SERVICE = {"timeout": (5, 20), "retries": 1, "pool_maxsize": 10}
+
+# Responses worth retrying, and methods that are safe to retry after the request was sent
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+
+class ServiceClient:
+    """Pooled session plus timeout/retry policy and metrics for one upstream"""
+
+    def __init__(self, name, timeout, retries, pool_maxsize):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.lock = threading.Lock()
+        self.metrics = {"requests": 0, "retries": 0, "failures": 0, "latency_seconds": 0.0}
+
+    def _record(self, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                self.metrics[key] += value
+
+    def _backoff(self, attempt):
+        # Full jitter: spreads retries from concurrent workers apart
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self._record(requests=1, latency_seconds=time.perf_counter() - started)
+                # Non-idempotent calls are only retried if the connection was never established
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if attempt >= self.retries or not retryable:
+                    self._record(failures=1)
+                    raise
+            else:
+                self._record(requests=1, latency_seconds=time.perf_counter() - started)
+                if not (idempotent and response.status_code in RETRY_STATUSES and attempt < self.retries):
+                    return response
+                response.close()
+
+            self._record(retries=1)
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        # urllib3 pools count the sockets they opened; every other request reused one
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics["latency_seconds"] = round(metrics["latency_seconds"], 3)
+        metrics["connections_opened"] = connections
+        metrics["connections_reused"] = max(0, metrics["requests"] - connections)
+        return metrics
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client(service):
+    """Shared ServiceClient for `service`, created on first use"""
+    with _clients_lock:
+        if service not in _clients:
+            config = SERVICES.get(service, DEFAULT_SERVICE)
+            _clients[service] = ServiceClient(service, **config)
+        return _clients[service]
+
+
+def get(service, url, **kwargs):
+    return client(service).get(url, **kwargs)
+
+
+def post(service, url, **kwargs):
+    return client(service).post(url, **kwargs)
+
+
+def stats():
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: service_client.stats() for name, service_client in clients.items()}
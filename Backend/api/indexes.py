@@ -0,0 +1,71 @@
+"""
+Indexes behind every query shape in the API, per collection.
+
+Built by `manage.py ensure_indexes`. Names are pinned so the command can tell
+declared indexes from ones created by hand, and so they match the indexes
+the caches, FestivalStore and festivals_near create lazily at runtime.
+"""
+import os
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT, IndexModel
+
+# Only documents that actually have the field take part in a unique index
+_HAS_STRING = {"$type": "string"}
+
+# get_festivals_by_user_preference: ranked $text search over preferences.
+# $text fails without it, and that view answers 503 until it exists.
+FESTIVAL_TEXT_INDEX = IndexModel(
+    [("title", TEXT), ("tags", TEXT), ("category", TEXT), ("content", TEXT)],
+    name="festival_text",
+    weights={"title": 5, "tags": 5, "category": 5, "content": 1},
+    default_language="english",
+    # Festivals have no per-document language; don't let a "language" field pick one
+    language_override="text_language",
+)
+
+# festivals_near: $geoNear needs it, so that view also creates it lazily
+FESTIVAL_GEO_INDEX = IndexModel([("geo", GEOSPHERE)], name="geo_2dsphere")
+
+INDEXES = {
+    "users": [
+        # signup / login / google_auth / get_festivals_by_user_preference lookups
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True,
+                   partialFilterExpression={"email": _HAS_STRING}),
+        IndexModel([("username", ASCENDING)], name="username_1", unique=True,
+                   partialFilterExpression={"username": _HAS_STRING}),
+        # signup with a referral code, apply_referral
+        IndexModel([("referralCode", ASCENDING)], name="referralCode_1", sparse=True),
+        # manage.py expire_subscriptions: only active plans are indexed, so the sweep reads just those
+        IndexModel([("premium.expires_at", ASCENDING)], name="premium.expires_at_1",
+                   partialFilterExpression={"premium.is_active": True}),
+    ],
+    "organizers": [
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True,
+                   partialFilterExpression={"email": _HAS_STRING}),
+        IndexModel([("username", ASCENDING)], name="username_1", unique=True,
+                   partialFilterExpression={"username": _HAS_STRING}),
+    ],
+    "festivals": [
+        # list_organizer_festivals: equality on organizer.id, newest first
+        IndexModel([("organizer.id", ASCENDING), ("dateAdded", DESCENDING)], name="organizer.id_1_dateAdded_-1",
+                   partialFilterExpression={"organizer.id": {"$exists": True}}),
+        FESTIVAL_TEXT_INDEX,
+        FESTIVAL_GEO_INDEX,
+        # Canonical fields from api/normalize.py: city equality + date range, month equality
+        IndexModel([("city_id", ASCENDING), ("start_date", ASCENDING)], name="city_id_1_start_date_1", sparse=True),
+        IndexModel([("month", ASCENDING), ("start_date", ASCENDING)], name="month_1_start_date_1"),
+        # FestivalStore upserts
+        IndexModel([("fingerprint", ASCENDING)], name="fingerprint_1", unique=True,
+                   partialFilterExpression={"fingerprint": {"$exists": True}}),
+        # FestivalSearchIndex refresh: $or of fetched_at / dateAdded >= watermark, one index per branch
+        IndexModel([("fetched_at", DESCENDING)], name="fetched_at_-1"),
+        IndexModel([("dateAdded", DESCENDING)], name="dateAdded_-1"),
+    ],
+    "ai_event_cache": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_1",
+                   expireAfterSeconds=int(float(os.environ.get('FESTIFLY_AI_CACHE_TTL_DAYS', 30)) * 86400)),
+    ],
+    "recommendation_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_1", expireAfterSeconds=0),
+    ],
+}
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+
+from api.passwords import PasswordHasherPool
+
+PASSWORD = "festifly-benchmark-password"
+
+
+def parse_counts(value):
+    try:
+        counts = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise CommandError(f"Expected comma-separated integers, got {value!r}")
+    if not counts or min(counts) < 1:
+        raise CommandError(f"Expected positive integers, got {value!r}")
+    return counts
+
+
+async def drive(pool, encoded, seconds):
+    """Logins completed through `pool` in about `seconds`, and the time actually taken"""
+    deadline = time.perf_counter() + seconds
+    done = 0
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await pool.check_password(PASSWORD, encoded)
+            done += 1
+
+    started = time.perf_counter()
+    # Twice as many clients as workers keeps every worker busy
+    await asyncio.gather(*(client() for _ in range(pool.workers * 2)))
+    return done, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password-login throughput (check_password) at the configured hasher cost, "
+        "single-threaded and through the hashing pool the login views use, per worker count. "
+        "Use --iterations to compare other PBKDF2 costs."
+    )
+
+    def add_arguments(self, parser):
+        cores = os.cpu_count() or 1
+        default_workers = sorted({1, 2, cores // 2 or 1, cores})
+        parser.add_argument("--seconds", type=float, default=3.0, help="Duration of each measurement")
+        parser.add_argument("--workers", default=",".join(str(n) for n in default_workers),
+                            help="Comma-separated hashing pool sizes to measure")
+        parser.add_argument("--iterations", default="",
+                            help="Comma-separated PBKDF2 iteration counts (default: the configured hasher's)")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher("default")
+        cores = os.cpu_count() or 1
+        seconds = options["seconds"]
+        workers = parse_counts(options["workers"])
+
+        if options["iterations"]:
+            if not hasattr(hasher, "iterations"):
+                raise CommandError(f"The {hasher.algorithm} hasher has no iteration count to vary")
+            costs = parse_counts(options["iterations"])
+        else:
+            costs = [getattr(hasher, "iterations", None)]
+
+        self.stdout.write(f"Hasher: {hasher.algorithm}, configured iterations: {getattr(hasher, 'iterations', 'n/a')}, "
+                          f"cores: {cores}, {seconds:g}s per measurement")
+
+        for iterations in costs:
+            # check_password reads the cost from the encoded hash, so any iteration count can be verified
+            if iterations is None:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            else:
+                encoded = hasher.encode(PASSWORD, hasher.salt(), iterations=iterations)
+            label = f"{iterations} iterations" if iterations else hasher.algorithm
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+
+            # Single thread, no pool: the CPU cost of one login
+            done, started = 0, time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                check_password(PASSWORD, encoded)
+                done += 1
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  direct      {done / elapsed:8.1f} logins/s   {1000 * elapsed / done:7.1f} ms/login")
+
+            for count in workers:
+                pool = PasswordHasherPool(workers=count, queue=count * 2)
+                try:
+                    done, elapsed = asyncio.run(drive(pool, encoded, seconds))
+                finally:
+                    pool.executor.shutdown()
+                rate = done / elapsed
+                per_core = rate / min(count, cores)
+                self.stdout.write(f"  pool x{count:<4} {rate:8.1f} logins/s   {per_core:7.1f} logins/s/core   "
+                                  f"max queue wait {1000 * pool.stats()['max_wait_seconds']:.0f} ms")
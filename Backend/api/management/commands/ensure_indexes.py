@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from pymongo.errors import OperationFailure, PyMongoError
+
+from api.db import get_db
+from api.indexes import INDEXES
+
+
+def index_usage(collection):
+    """{index name: (ops, since)} from $indexStats, or None if the server won't tell us"""
+    try:
+        return {
+            stat["name"]: (stat["accesses"]["ops"], stat["accesses"]["since"])
+            for stat in collection.aggregate([{"$indexStats": {}}])
+        }
+    except OperationFailure:
+        return None
+
+
+class Command(BaseCommand):
+    help = "Build the indexes declared in api/indexes.py and report missing, undeclared and unused indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report, don't build missing indexes")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        check_only = options["check"]
+        problems = 0
+
+        for collection_name, models in INDEXES.items():
+            collection = db[collection_name]
+            self.stdout.write(self.style.MIGRATE_HEADING(collection_name))
+            existing = collection.index_information()
+            declared = set()
+            created = set()
+
+            for model in models:
+                name = model.document["name"]
+                declared.add(name)
+                if name in existing:
+                    self.stdout.write(f"  ok         {name}")
+                elif check_only:
+                    problems += 1
+                    self.stdout.write(self.style.WARNING(f"  missing    {name}"))
+                else:
+                    try:
+                        collection.create_indexes([model])
+                        created.add(name)
+                        self.stdout.write(self.style.SUCCESS(f"  created    {name}"))
+                    except PyMongoError as e:
+                        # e.g. duplicates blocking a unique index, or the same keys under another name
+                        problems += 1
+                        self.stdout.write(self.style.ERROR(f"  failed     {name}: {e}"))
+
+            for name in existing:
+                if name != "_id_" and name not in declared:
+                    self.stdout.write(self.style.WARNING(f"  undeclared {name}"))
+
+            usage = index_usage(collection)
+            if usage is None:
+                self.stdout.write("  (no $indexStats access, skipping usage report)")
+                continue
+            for name, (ops, since) in sorted(usage.items()):
+                if name != "_id_" and name not in created and ops == 0:
+                    self.stdout.write(self.style.WARNING(f"  unused     {name} (no queries since {since:%Y-%m-%d %H:%M} UTC)"))
+
+        if problems:
+            self.stdout.write(self.style.ERROR(f"{problems} index problem(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("All declared indexes present"))
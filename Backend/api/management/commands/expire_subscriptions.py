@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.db import get_db
+from api.subscriptions import expire_subscriptions, now_ist
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark lapsed premium plans inactive in one bulk update. Meant to run on a schedule "
+        "(e.g. hourly from cron); requests already treat a lapsed plan as inactive without it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the plans that would be expired")
+
+    def handle(self, *args, **options):
+        users = get_db()["users"]
+        now = now_ist()
+
+        if options["dry_run"]:
+            lapsed = users.count_documents({"premium.is_active": True, "premium.expires_at": {"$lt": now}})
+            self.stdout.write(f"{lapsed} subscription(s) would be expired")
+            return
+
+        expired = expire_subscriptions(users, now)
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} subscription(s)"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Move base64 voice briefings stored on festival documents into the media store"
+
+    def handle(self, *args, **options):
+        # Imported here: the views module connects services at import time
+        from api.views import festival_collection, move_voice_blob_to_media_store
+
+        moved = 0
+        festivals = festival_collection.find({"ai_voice_data": {"$exists": True}}, {"ai_voice_data": 1})
+        for fest in festivals:
+            for language, voice in (fest.get("ai_voice_data") or {}).items():
+                if isinstance(voice, dict) and voice.get("blob"):
+                    audio_id = move_voice_blob_to_media_store(str(fest["_id"]), language, voice["blob"])
+                    moved += 1
+                    self.stdout.write(f"{fest['_id']} [{language}] -> {audio_id}")
+
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} voice briefing(s)"))
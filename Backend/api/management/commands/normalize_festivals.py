@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from api.db import get_db
+from api.normalize import NORMALIZATION_VERSION, normalization_update
+
+JOB_ID = "normalize_festivals"
+SOURCE_FIELDS = {"location": 1, "month": 1, "date_info": 1, "fetched_at": 1, "dateAdded": 1}
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill canonical city, geo, month and start/end dates on stored festivals. "
+        "Walks the collection in _id order and checkpoints after every batch, so it can be "
+        "interrupted and re-run; it starts over when NORMALIZATION_VERSION changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        festivals = db["festivals"]
+        jobs = db["maintenance_jobs"]
+
+        checkpoint = jobs.find_one({"_id": JOB_ID}) or {}
+        if options["restart"] or checkpoint.get("version") != NORMALIZATION_VERSION:
+            checkpoint = {}
+        last_id = checkpoint.get("last_id")
+        processed = checkpoint.get("processed", 0)
+        if last_id is not None:
+            self.stdout.write(f"Resuming after {last_id} ({processed} festivals already done)")
+
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(festivals.find(query, SOURCE_FIELDS).sort("_id", 1).limit(options["batch_size"]))
+            if not batch:
+                break
+
+            festivals.bulk_write(
+                [UpdateOne({"_id": fest["_id"]}, normalization_update(fest)) for fest in batch],
+                ordered=False,
+            )
+            last_id = batch[-1]["_id"]
+            processed += len(batch)
+            jobs.update_one(
+                {"_id": JOB_ID},
+                {"$set": {
+                    "last_id": last_id,
+                    "processed": processed,
+                    "version": NORMALIZATION_VERSION,
+                    "updated_at": datetime.utcnow(),
+                }},
+                upsert=True,
+            )
+            self.stdout.write(f"  {processed} festivals normalized (up to {last_id})")
+
+        jobs.update_one({"_id": JOB_ID}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True)
+        self.stdout.write(self.style.SUCCESS(f"Done: {processed} festivals normalized"))
@@ -0,0 +1,82 @@
+"""
+Content-addressed media storage in GridFS.
+
+Files are stored once under the SHA-256 of their bytes, which doubles as the
+media id and the (strong) ETag. Documents keep only that id; the bytes are
+served by the media view in chunks, with HTTP Range support.
+"""
+import hashlib
+import re
+
+import gridfs
+from gridfs.errors import NoFile
+
+MEDIA_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 256 * 1024
+
+
+class MediaStore:
+    def __init__(self, db, bucket_name="media"):
+        self.db = db
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = gridfs.GridFSBucket(self.db, bucket_name=self.bucket_name, chunk_size_bytes=CHUNK_SIZE)
+        return self._bucket
+
+    def put(self, data, content_type):
+        """Store `data` unless identical bytes are already stored; returns the media id"""
+        media_id = hashlib.sha256(data).hexdigest()
+        if self.db[f"{self.bucket_name}.files"].find_one({"filename": media_id}, {"_id": 1}) is None:
+            self.bucket.upload_from_stream(media_id, data, metadata={"content_type": content_type})
+        return media_id
+
+    def open(self, media_id):
+        """Readable, seekable GridOut for `media_id`, or None if it doesn't exist"""
+        if not MEDIA_ID_RE.match(media_id or ""):
+            return None
+        try:
+            return self.bucket.open_download_stream_by_name(media_id)
+        except NoFile:
+            return None
+
+
+def parse_range(header, length):
+    """
+    (start, end) inclusive for a single-range "bytes=" header, None when there is
+    no usable Range header, or False when the range can't be satisfied.
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(0, length - suffix), length - 1
+
+    start = int(first)
+    end = min(int(last), length - 1) if last else length - 1
+    if start >= length or start > end:
+        return False
+    return start, end
+
+
+def iter_chunks(grid_out, start, end):
+    grid_out.seek(start)
+    remaining = end - start + 1
+    try:
+        while remaining > 0:
+            chunk = grid_out.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
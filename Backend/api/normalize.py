@@ -0,0 +1,195 @@
+"""
+Canonical location and date fields for festivals.
+
+Free-text locations map to gazetteer city ids (the gazetteer's aliases are
+the alias table: "Bangalore", "bengaluru, Karnataka" -> "in-bengaluru"),
+months to their full English name, and date_info text ("12-15 Dec 2025",
+"Dec 28 - Jan 3", "2025-12-12") to start/end dates. Stored on every
+festival, these let lookups use indexed equality and range queries instead
+of regexes.
+"""
+import calendar
+import re
+from datetime import datetime, timedelta
+
+from .geo import find_city, geo_point
+
+# Bump when the rules below change, so the backfill command runs again
+NORMALIZATION_VERSION = 2
+
+MONTHS = {}
+for _number in range(1, 13):
+    MONTHS[calendar.month_name[_number].lower()] = _number
+    MONTHS[calendar.month_abbr[_number].lower()] = _number
+MONTHS["sept"] = 9
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+DATE_TOKEN_RE = re.compile(
+    r"(?P<year>\b(?:19|20)\d{2}\b)"
+    r"|(?P<day>\b\d{1,2})(?:st|nd|rd|th)?\b(?![:.]\d)(?!\s*(?:am|pm|hrs)\b)"
+    r"|(?P<word>[a-z]+)"
+)
+# Words allowed between a month and its days ("December 12 to 15", "Friday, 12th of Dec")
+FILLER_WORDS = frozenset(
+    ["to", "till", "until", "and", "through", "thru", "from", "of", "the", "st", "nd", "rd", "th"]
+    + [day.lower() for day in calendar.day_name] + [day.lower() for day in calendar.day_abbr]
+)
+# A parsed festival that ended this long before the reference date is taken to be next year's
+PAST_GRACE = timedelta(days=60)
+
+
+def normalize_month(value):
+    """Full month name ("December") for "Dec", "december 2025", "12"...; None if there is none"""
+    text = str(value or "").strip().lower()
+    if text.isdigit() and 1 <= int(text) <= 12:
+        return calendar.month_name[int(text)]
+    for word in re.findall(r"[a-z]+", text):
+        if word in MONTHS:
+            return calendar.month_name[MONTHS[word]]
+    return None
+
+
+def _valid_date(year, month, day):
+    if 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]:
+        return datetime(year, month, day)
+    return None
+
+
+def _next_year(date):
+    try:
+        return date.replace(year=date.year + 1)
+    except ValueError:
+        # Feb 29
+        return date.replace(year=date.year + 1, day=28)
+
+
+def _scan_dates(text):
+    """
+    Dates mentioned in `text`, in order, as {"day", "month", "year"} dicts (year None
+    when not given), plus the months mentioned without any day.
+    """
+    dates, months = [], []
+    pending_days, current_month = [], None
+
+    for match in DATE_TOKEN_RE.finditer(text):
+        if match.group("year"):
+            # The year applies to the undated mentions before it, walking back over
+            # year boundaries: in "Dec 28 - Jan 3 2026", Dec is 2025
+            year = int(match.group("year"))
+            undated = [m for m in dates + months if m["year"] is None]
+            undated.sort(key=lambda m: m["order"], reverse=True)
+            previous_month = None
+            for mention in undated:
+                if previous_month is not None and mention["month"] > previous_month:
+                    year -= 1
+                mention["year"] = year
+                previous_month = mention["month"]
+        elif match.group("day"):
+            day = int(match.group("day"))
+            if not 1 <= day <= 31:
+                continue
+            if current_month:
+                # Month first: "December 12-15"
+                current_month["has_days"] = True
+                dates.append({"day": day, "month": current_month["month"], "year": None, "order": match.start()})
+            else:
+                pending_days.append((day, match.start()))
+        else:
+            word = match.group("word")
+            if word in MONTHS:
+                if pending_days:
+                    # Day first: "12-15 December"
+                    dates.extend({"day": day, "month": MONTHS[word], "year": None, "order": order} for day, order in pending_days)
+                    pending_days, current_month = [], None
+                else:
+                    current_month = {"day": 1, "month": MONTHS[word], "year": None, "order": match.start(), "has_days": False}
+                    months.append(current_month)
+            elif word not in FILLER_WORDS:
+                pending_days, current_month = [], None
+
+    return dates, [m for m in months if not m["has_days"]]
+
+
+def parse_date_info(text, reference=None):
+    """
+    (start_date, end_date) as naive UTC datetimes parsed from free text, or (None, None).
+
+    A single day gives start == end; a bare month gives the whole month. Missing
+    years come from `reference` (default: now), rolled forward a year when that
+    would put the festival well in the past.
+    """
+    reference = reference or datetime.utcnow()
+    text = str(text or "").lower()
+
+    iso = [_valid_date(int(y), int(m), int(d)) for y, m, d in ISO_DATE_RE.findall(text)]
+    iso = [date for date in iso if date]
+    if iso:
+        return min(iso), max(iso)
+
+    dates, months = _scan_dates(ISO_DATE_RE.sub(" ", text))
+    inferred_year = not any(mention["year"] for mention in dates + months)
+
+    if dates:
+        first, last = dates[0], dates[-1]
+        start = _valid_date(first["year"] or reference.year, first["month"], first["day"])
+        end = _valid_date(last["year"] or reference.year, last["month"], last["day"])
+    elif months:
+        first, last = months[0], months[-1]
+        start = datetime(first["year"] or reference.year, first["month"], 1)
+        end_year = last["year"] or reference.year
+        end = datetime(end_year, last["month"], calendar.monthrange(end_year, last["month"])[1])
+    else:
+        return None, None
+
+    if start is None or end is None:
+        return None, None
+    if end < start:
+        # "Dec 28 - Jan 3": the range wraps into the next year
+        end = _next_year(end)
+    if inferred_year and end < reference - PAST_GRACE:
+        start, end = _next_year(start), _next_year(end)
+    return start, end
+
+
+def normalized_fields(fest, reference=None):
+    """
+    Canonical fields for a festival dict: city_id, city, geo, month, start_date,
+    end_date. Values are None where nothing could be derived.
+    """
+    if reference is None:
+        stamps = [fest.get("fetched_at"), fest.get("dateAdded")]
+        reference = next((stamp for stamp in stamps if isinstance(stamp, datetime)), None)
+
+    city = find_city(fest.get("location"))
+    start, end = parse_date_info(fest.get("date_info"), reference)
+    month = normalize_month(fest.get("month")) or (calendar.month_name[start.month] if start else None)
+    return {
+        "city_id": city["id"] if city else None,
+        "city": city["name"] if city else None,
+        "geo": geo_point(city["lng"], city["lat"]) if city else None,
+        "month": month,
+        "start_date": start,
+        "end_date": end,
+        "normalized_version": NORMALIZATION_VERSION,
+    }
+
+
+def normalize_festival(fest, reference=None):
+    """Set the canonical fields on `fest` in place (dropping ones that no longer apply); returns it"""
+    for field, value in normalized_fields(fest, reference).items():
+        if value is None:
+            if field != "month":
+                fest.pop(field, None)
+        else:
+            fest[field] = value
+    return fest
+
+
+def normalization_update(fest, reference=None):
+    """MongoDB update document applying normalized_fields() to a stored festival"""
+    fields = normalized_fields(fest, reference)
+    update = {"$set": {field: value for field, value in fields.items() if value is not None}}
+    unset = {field: "" for field, value in fields.items() if value is None and field != "month"}
+    if unset:
+        update["$unset"] = unset
+    return update
@@ -0,0 +1,80 @@
+"""
+Password hashing off the request thread.
+
+make_password/check_password run PBKDF2 at Django's iteration count, tens
+of milliseconds of CPU per call. The async signup/login views hand them to
+a dedicated pool of FESTIFLY_HASH_WORKERS threads (default: one per core);
+hashlib releases the GIL while hashing, so logins use at most that many
+cores and the event loop keeps serving other requests meanwhile.
+
+At most FESTIFLY_HASH_QUEUE calls wait for a worker. Past that, callers get
+HashingBusy and the views answer 503, so a login spike is shed instead of
+queueing without bound. `manage.py benchmark_logins` measures what a core
+sustains at the configured cost.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+
+HASH_WORKERS = int(os.environ.get('FESTIFLY_HASH_WORKERS', os.cpu_count() or 2))
+HASH_QUEUE = int(os.environ.get('FESTIFLY_HASH_QUEUE', HASH_WORKERS * 8))
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full"""
+
+
+class PasswordHasherPool:
+    def __init__(self, workers=HASH_WORKERS, queue=HASH_QUEUE):
+        self.workers = workers
+        self.queue = queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="festifly-hash")
+        # Running + waiting calls; acquired without blocking so a full pool fails fast
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.metrics = {"hashes": 0, "checks": 0, "rejected": 0, "busy_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    async def _run(self, metric, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.metrics["rejected"] += 1
+            raise HashingBusy("Too many sign-ins in progress, please retry shortly")
+        try:
+            submitted = time.perf_counter()
+            started = []
+
+            def timed():
+                started.append(time.perf_counter())
+                return fn(*args)
+
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+            finished = time.perf_counter()
+            with self.lock:
+                self.metrics[metric] += 1
+                self.metrics["busy_seconds"] += finished - started[0]
+                self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], started[0] - submitted)
+            return result
+        finally:
+            self.slots.release()
+
+    async def make_password(self, raw_password):
+        return await self._run("hashes", make_password, raw_password)
+
+    async def check_password(self, raw_password, encoded):
+        return await self._run("checks", check_password, raw_password, encoded)
+
+    def stats(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics["busy_seconds"] = round(metrics["busy_seconds"], 3)
+        metrics["max_wait_seconds"] = round(metrics["max_wait_seconds"], 3)
+        metrics["workers"] = self.workers
+        metrics["queue"] = self.queue
+        return metrics
+
+
+password_pool = PasswordHasherPool()
@@ -0,0 +1,55 @@
+"""
+Field projections for festival reads.
+
+Each call site asks MongoDB for the fields it actually uses, so wire size and
+BSON decoding scale with the endpoint rather than with the document (reviews,
+AI voice/video data). Public endpoints also accept a `fields=` sparse fieldset,
+validated against PUBLIC_FESTIVAL_FIELDS.
+"""
+import re
+
+# Top-level festival fields clients may ask for with fields=
+PUBLIC_FESTIVAL_FIELDS = frozenset([
+    "title", "location", "tags", "content", "url", "month", "category", "source", "status",
+    "reddit_url", "upvotes", "vibe_score", "fetched_at", "dateAdded", "subreddit", "organizer",
+    "reddit_review", "unique_highlights", "ai_enhanced", "ai_voice_data", "ai_video_data",
+])
+
+# What the prompts in the voice briefing / AI video endpoints read
+BRIEFING_FIELDS = ["title", "location", "month", "vibe_score", "content"]
+BRIEFING_REVIEW_COUNT = 3
+
+LANGUAGE_RE = re.compile(r"^[a-z]{2,3}(-[a-z]{2,4})?$")
+
+
+def projection(*fields, **slices):
+    """Projection document for `fields`; slices={"field": n} keeps only the first n array items"""
+    spec = {field: 1 for field in fields}
+    spec.update({field: {"$slice": count} for field, count in slices.items()})
+    return spec
+
+
+def briefing_projection(*extra_fields):
+    return projection(*BRIEFING_FIELDS, *extra_fields, reddit_review=BRIEFING_REVIEW_COUNT)
+
+
+def is_valid_language(language):
+    """Languages end up in field paths (ai_voice_data.<language>), so only accept plain codes"""
+    return bool(LANGUAGE_RE.match(language or ""))
+
+
+def parse_fields(value):
+    """
+    Sparse fieldset from a fields= value (comma-separated string or list).
+
+    Returns None when not given; raises ValueError on unknown fields.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    fields = [str(field).strip() for field in value if str(field).strip()]
+    unknown = sorted(set(fields) - PUBLIC_FESTIVAL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
@@ -0,0 +1,84 @@
+"""
+Per-plan usage limits for voice briefings and videos.
+
+reserve() takes one unit with a single conditional find_one_and_update: the
+counter is only incremented while it is below the plan's limit, so
+concurrent requests can't overshoot it. Callers release() the reservation
+when the upstream generation fails.
+"""
+from .tokens import bump_usage
+
+FREE_PLAN = "free"
+
+# Units per plan; None means unlimited (and not counted)
+PLAN_LIMITS = {
+    "voice": {FREE_PLAN: 2, "monthly": 5, "yearly": None},
+    "video": {FREE_PLAN: 1, "monthly": 2, "yearly": 6},
+}
+USAGE_FIELDS = {"voice": "voice_usage", "video": "video_usage"}
+
+LIMIT_MESSAGES = {
+    ("voice", FREE_PLAN): "You've reached your free tier limit of {limit} voice generations. Please upgrade to a premium plan.",
+    ("voice", "monthly"): "You've reached your monthly limit of {limit} voice generations. Please upgrade to our annual plan for unlimited access.",
+    ("video", FREE_PLAN): "You have reached the video generation limit for free users ({limit} video). Please upgrade to generate more videos.",
+    ("video", "monthly"): "You have reached the video generation limit for your monthly plan ({limit} videos). Upgrade to yearly for more videos.",
+    ("video", "yearly"): "You have reached the video generation limit for your yearly plan ({limit} videos).",
+}
+
+
+def limit_for(kind, plan):
+    """Units of `kind` allowed on `plan` (an active plan name or None), None if unlimited"""
+    limits = PLAN_LIMITS[kind]
+    return limits.get(plan or FREE_PLAN, limits[FREE_PLAN])
+
+
+def remaining(kind, plan, used):
+    limit = limit_for(kind, plan)
+    return None if limit is None else max(0, limit - used)
+
+
+def limit_message(kind, plan):
+    plan = plan if (kind, plan) in LIMIT_MESSAGES else FREE_PLAN
+    return LIMIT_MESSAGES[(kind, plan)].format(limit=limit_for(kind, plan))
+
+
+def limits_summary():
+    """PLAN_LIMITS in the shape subscription_status reports ("unlimited" for None)"""
+    return {
+        kind: {plan: "unlimited" if limit is None else limit for plan, limit in limits.items()}
+        for kind, limits in PLAN_LIMITS.items()
+    }
+
+
+class Reservation:
+    def __init__(self, users_collection, user_id, kind, counted):
+        self.users_collection = users_collection
+        self.user_id = user_id
+        self.kind = kind
+        self.counted = counted
+        self.released = False
+
+    def release(self):
+        """Give the unit back; safe to call more than once"""
+        if not self.counted or self.released:
+            return
+        self.released = True
+        field = USAGE_FIELDS[self.kind]
+        bump_usage(self.users_collection, self.user_id, field, amount=-1, conditions={field: {"$gt": 0}})
+
+
+def reserve(users_collection, user_id, kind, plan):
+    """
+    A Reservation for one unit of `kind` (user_id is the user's ObjectId), or
+    None if the plan's limit is already used up. Unlimited plans are not counted.
+    """
+    limit = limit_for(kind, plan)
+    if limit is None:
+        return Reservation(users_collection, user_id, kind, counted=False)
+
+    field = USAGE_FIELDS[kind]
+    # A missing counter is 0: {"$lt": limit} alone would not match it
+    conditions = {"$or": [{field: {"$lt": limit}}, {field: {"$exists": False}}]}
+    if bump_usage(users_collection, user_id, field, conditions=conditions) is None:
+        return None
+    return Reservation(users_collection, user_id, kind, counted=True)
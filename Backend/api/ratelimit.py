@@ -0,0 +1,102 @@
+"""
+Token-bucket rate limiting shared by every thread in a worker.
+
+Buckets are keyed by "host:<netloc>" for scraped sites and "api:<name>" for
+upstream APIs. A caller only blocks when its bucket is actually empty, and
+every wait is recorded so throttling shows up separately from real work.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+# (requests per second, burst) per bucket key; anything else gets DEFAULT_HOST_RATE
+DEFAULT_HOST_RATE = (
+    float(os.environ.get('FESTIFLY_HOST_RATE_PER_SEC', 2)),
+    int(os.environ.get('FESTIFLY_HOST_BURST', 4)),
+)
+BUCKET_RATES = {
+    "host:www.google.com": (1 / 3, 2),
+    "api:gemini": (
+        float(os.environ.get('FESTIFLY_GEMINI_RPM', 120)) / 60,
+        int(os.environ.get('FESTIFLY_GEMINI_BURST', 10)),
+    ),
+}
+
+
+class TokenBucket:
+    """Classic token bucket; waits are reserved under the lock and slept outside it"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self, tokens=1):
+        """Take `tokens`, sleeping only if the bucket is empty. Returns seconds waited."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens may go negative: that reserves our slot for threads queued behind us
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.waited += wait
+                self.max_wait = max(self.max_wait, wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rate_per_sec": round(self.rate, 3),
+                "burst": self.capacity,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited, 3),
+                "max_wait_seconds": round(self.max_wait, 3),
+            }
+
+
+class RateLimiter:
+    """Registry of token buckets, created on first use"""
+
+    def __init__(self, rates=None, default_rate=DEFAULT_HOST_RATE):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, key):
+        with self.lock:
+            if key not in self.buckets:
+                rate, burst = self.rates.get(key, self.default_rate)
+                self.buckets[key] = TokenBucket(rate, burst)
+            return self.buckets[key]
+
+    def acquire(self, key, tokens=1):
+        return self.bucket(key).acquire(tokens)
+
+    def acquire_host(self, url):
+        return self.acquire(f"host:{urlparse(url).netloc.lower()}")
+
+    def stats(self):
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {key: bucket.stats() for key, bucket in buckets.items()}
+
+
+# One limiter per worker process
+rate_limiter = RateLimiter(BUCKET_RATES)
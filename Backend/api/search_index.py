@@ -0,0 +1,278 @@
+"""
+In-process search over the festival catalog.
+
+An inverted index (token -> {festival id: weighted term frequency}) scored with
+BM25 over title, tags and content, plus tag and month facets and a location
+token filter. It is built from MongoDB on first use, then topped up in the
+background from documents whose fetched_at/dateAdded is at or past the
+watermark. Edits that don't touch those timestamps and deletions are picked
+up by the periodic full rebuild.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from pymongo.errors import PyMongoError
+
+from .normalize import normalize_month
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset("a an and are at be by for from in is it of on or the to with".split())
+
+# Weighted term frequency: a title or tag hit counts more than a content hit
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "content": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+INDEXED_FIELDS = ["title", "content", "tags", "location", "month", "url", "fetched_at", "dateAdded"]
+SNIPPET_LENGTH = 200
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(str(text or "").lower()) if token not in STOPWORDS]
+
+
+def _timestamp(fest):
+    """Newest of fetched_at/dateAdded, ignoring non-datetime values from old documents"""
+    stamps = [value for value in (fest.get("fetched_at"), fest.get("dateAdded")) if isinstance(value, datetime)]
+    return max(stamps) if stamps else None
+
+
+class _Index:
+    """The index data; only mutated while unreachable from searches, or under FestivalSearchIndex.lock"""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)   # token -> {doc_id: weighted tf}
+        self.locations = defaultdict(set)   # location token -> doc_ids
+        self.tags = defaultdict(set)        # tag -> doc_ids
+        self.months = defaultdict(set)      # month -> doc_ids
+        self.docs = {}                      # doc_id -> {"summary", "length", "tokens", "tags", "month", "locations", "timestamp"}
+        self.total_length = 0.0
+
+    def add(self, fest):
+        doc_id = str(fest["_id"])
+        self.remove(doc_id)
+
+        tags = [str(tag).strip().lower() for tag in fest.get("tags") or [] if str(tag).strip()]
+        weighted = Counter()
+        for token in tokenize(fest.get("title")):
+            weighted[token] += FIELD_WEIGHTS["title"]
+        for token in tokenize(" ".join(tags)):
+            weighted[token] += FIELD_WEIGHTS["tags"]
+        for token in tokenize(fest.get("content")):
+            weighted[token] += FIELD_WEIGHTS["content"]
+
+        for token, tf in weighted.items():
+            self.postings[token][doc_id] = tf
+        location_tokens = set(tokenize(fest.get("location")))
+        for token in location_tokens:
+            self.locations[token].add(doc_id)
+        for tag in tags:
+            self.tags[tag].add(doc_id)
+        # Canonical month names, so festivals stored before normalization ("Dec", "12") match too
+        month = normalize_month(fest.get("month"))
+        if month:
+            self.months[month].add(doc_id)
+
+        length = sum(weighted.values())
+        self.total_length += length
+        content = str(fest.get("content") or "")
+        self.docs[doc_id] = {
+            "summary": {
+                "_id": doc_id,
+                "title": fest.get("title"),
+                "location": fest.get("location"),
+                "tags": fest.get("tags"),
+                "month": fest.get("month"),
+                "url": fest.get("url"),
+                "snippet": content[:SNIPPET_LENGTH],
+            },
+            "length": length,
+            "tokens": list(weighted),
+            "tags": tags,
+            "month": month,
+            "locations": location_tokens,
+            "timestamp": _timestamp(fest),
+        }
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for token in doc["tokens"]:
+            self._discard(self.postings, token, doc_id)
+        for token in doc["locations"]:
+            self._discard(self.locations, token, doc_id)
+        for tag in doc["tags"]:
+            self._discard(self.tags, tag, doc_id)
+        if doc["month"]:
+            self._discard(self.months, doc["month"], doc_id)
+
+    @staticmethod
+    def _discard(mapping, key, doc_id):
+        entries = mapping.get(key)
+        if entries is None:
+            return
+        if isinstance(entries, dict):
+            entries.pop(doc_id, None)
+        else:
+            entries.discard(doc_id)
+        if not entries:
+            del mapping[key]
+
+
+class FestivalSearchIndex:
+    def __init__(self, collection, refresh_seconds=30, rebuild_seconds=3600):
+        self.collection = collection
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.index = None
+        self.watermark = None
+        self.last_refresh = 0.0
+        self.last_rebuild = 0.0
+        self.lock = threading.Lock()           # guards self.index contents
+        self.refresh_lock = threading.Lock()   # one refresh at a time
+        self.metrics = {"searches": 0, "rebuilds": 0, "refreshes": 0, "refreshed_docs": 0, "refresh_errors": 0}
+
+    def _load(self, query):
+        return self.collection.find(query, {field: 1 for field in INDEXED_FIELDS})
+
+    def _rebuild(self):
+        index = _Index()
+        watermark = None
+        for fest in self._load({}):
+            index.add(fest)
+            stamp = _timestamp(fest)
+            if stamp and (watermark is None or stamp > watermark):
+                watermark = stamp
+        with self.lock:
+            self.index = index
+            self.watermark = watermark
+            self.metrics["rebuilds"] += 1
+        self.last_rebuild = self.last_refresh = time.monotonic()
+
+    def _refresh(self):
+        if self.watermark is None:
+            return self._rebuild()
+        # >= so documents stamped in the same instant as the watermark aren't missed; re-adding is idempotent
+        query = {"$or": [{"fetched_at": {"$gte": self.watermark}}, {"dateAdded": {"$gte": self.watermark}}]}
+        changed = list(self._load(query))
+        with self.lock:
+            for fest in changed:
+                self.index.add(fest)
+                stamp = _timestamp(fest)
+                if stamp and stamp > self.watermark:
+                    self.watermark = stamp
+            self.metrics["refreshes"] += 1
+            self.metrics["refreshed_docs"] += len(changed)
+        self.last_refresh = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Build the index on first use (the only time a search waits for MongoDB);
+        afterwards start a background top-up, or a full rebuild when one is due.
+        """
+        if self.index is None:
+            with self.refresh_lock:
+                if self.index is None:
+                    self._rebuild()
+            return
+
+        if time.monotonic() - self.last_refresh < self.refresh_seconds:
+            return
+        if self.refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._background_refresh, name="festifly-search-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            if time.monotonic() - self.last_rebuild >= self.rebuild_seconds:
+                self._rebuild()
+            else:
+                self._refresh()
+        except PyMongoError as e:
+            print(f"Search index refresh failed: {e}")
+            with self.lock:
+                self.metrics["refresh_errors"] += 1
+            # Keep serving the current index; try again after the next interval
+            self.last_refresh = time.monotonic()
+        finally:
+            self.refresh_lock.release()
+
+    def search(self, text="", tags=None, month=None, location=None, limit=20, offset=0, facet_size=20):
+        """
+        Festivals matching any token of `text` (all festivals if empty), narrowed to
+        those with every tag in `tags`, the given month and every token of `location`.
+        Ranked by BM25 (newest first without text). Facet counts cover all matches.
+        """
+        self.ensure_fresh()
+        tokens = list(dict.fromkeys(tokenize(text)))
+        tags = [str(tag).strip().lower() for tag in tags or [] if str(tag).strip()]
+
+        with self.lock:
+            index = self.index
+            self.metrics["searches"] += 1
+
+            scores = {}
+            if tokens:
+                doc_count = len(index.docs)
+                average_length = index.total_length / doc_count if doc_count else 0.0
+                for token in tokens:
+                    postings = index.postings.get(token)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = 1 - BM25_B + BM25_B * index.docs[doc_id]["length"] / (average_length or 1.0)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                candidates = set(scores)
+            else:
+                candidates = set(index.docs)
+
+            filters = [index.tags.get(tag, set()) for tag in tags]
+            if month:
+                filters.append(index.months.get(normalize_month(month), set()))
+            filters.extend(index.locations.get(token, set()) for token in tokenize(location))
+            for allowed in sorted(filters, key=len):
+                candidates &= allowed
+                if not candidates:
+                    break
+
+            if tokens:
+                ranked = heapq.nlargest(offset + limit, candidates, key=lambda doc_id: (scores[doc_id], doc_id))
+            else:
+                ranked = heapq.nlargest(
+                    offset + limit, candidates,
+                    key=lambda doc_id: (index.docs[doc_id]["timestamp"] or datetime.min, doc_id),
+                )
+
+            results = []
+            for doc_id in ranked[offset:]:
+                hit = dict(index.docs[doc_id]["summary"])
+                hit["score"] = round(scores.get(doc_id, 0.0), 4)
+                results.append(hit)
+
+            tag_counts = Counter(tag for doc_id in candidates for tag in index.docs[doc_id]["tags"])
+            month_counts = Counter(index.docs[doc_id]["month"] for doc_id in candidates if index.docs[doc_id]["month"])
+
+        return {
+            "total": len(candidates),
+            "results": results,
+            "facets": {
+                "tags": dict(tag_counts.most_common(facet_size)),
+                "month": dict(month_counts.most_common()),
+            },
+        }
+
+    def stats(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+            if self.index is not None:
+                metrics["documents"] = len(self.index.docs)
+                metrics["tokens"] = len(self.index.postings)
+            metrics["watermark"] = self.watermark.isoformat() if self.watermark else None
+        return metrics
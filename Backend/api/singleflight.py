@@ -0,0 +1,72 @@
+"""
+In-flight request coalescing ("single flight").
+
+The first caller for a key runs the work; callers arriving with the same key
+while it is still running wait for that result instead of repeating it.
+Coalescing is per worker process, across all of its threads.
+"""
+import threading
+
+
+class SingleFlightTimeout(Exception):
+    """Raised to a waiting caller when the leader did not finish in time"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.metrics = {"leaders": 0, "coalesced": 0, "timeouts": 0, "errors": 0}
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() once per key at a time.
+
+        Returns (result, shared) where shared is True if this caller waited on
+        another caller's run. The leader's exception is re-raised to every waiter.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.metrics["leaders"] += 1
+            else:
+                self.metrics["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                with self.lock:
+                    self.metrics["errors"] += 1
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            with self.lock:
+                self.metrics["timeouts"] += 1
+            raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for in-flight request")
+
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+    def is_running(self, key):
+        with self.lock:
+            return key in self.calls
+
+    def stats(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics["in_flight"] = len(self.calls)
+        return metrics
@@ -0,0 +1,58 @@
+"""
+Premium subscription expiry.
+
+payment_success stores premium.expires_at as naive IST wall-clock time.
+Request paths work out whether a plan is still active from that timestamp
+alone and never write; `manage.py expire_subscriptions` flips the stored
+is_active flag on lapsed plans in bulk, with one indexed update_many.
+"""
+from datetime import datetime, timedelta
+
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def now_ist():
+    return datetime.utcnow() + IST_OFFSET
+
+
+def is_lapsed(premium, now=None):
+    """True if `premium` is flagged active but its expiry has passed"""
+    expires_at = (premium or {}).get("expires_at")
+    return bool((premium or {}).get("is_active")) and isinstance(expires_at, datetime) and expires_at < (now or now_ist())
+
+
+def premium_status(premium, now=None):
+    """Copy of a premium subdocument with is_active/expired as of `now` (IST)"""
+    premium = dict(premium or {})
+    if is_lapsed(premium, now):
+        premium["is_active"] = False
+        premium["expired"] = True
+    return premium
+
+
+def active_plan(user, now=None):
+    """The user's plan ("monthly"/"yearly") while it is active, else None"""
+    premium = premium_status((user or {}).get("premium"), now)
+    return premium.get("plan") if premium.get("is_active") else None
+
+
+def check_subscription_expiry(user, now=None):
+    """
+    `user` with its premium status as of `now`. Read-only: a lapsed plan comes
+    back as a copy marked inactive, and the stored document is left for the sweep.
+    """
+    if not user or not is_lapsed(user.get("premium"), now):
+        return user
+    user = dict(user)
+    user["premium"] = premium_status(user["premium"], now)
+    return user
+
+
+def expire_subscriptions(users_collection, now=None):
+    """Mark every lapsed plan inactive; returns how many were changed"""
+    now = now or now_ist()
+    result = users_collection.update_many(
+        {"premium.is_active": True, "premium.expires_at": {"$lt": now}},
+        {"$set": {"premium.is_active": False, "premium.expired": True, "premium.expired_at": now}},
+    )
+    return result.modified_count
@@ -1,3 +1,845 @@
-from django.test import TestCase
+import json
+import operator
+import re
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import RequestFactory, SimpleTestCase
+from bson import ObjectId
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from . import users, views
+from .auth import Principal
+from .festival_store import FestivalStore
+from .fetch_engine import SourceTimings, summarize_timings
+from .geo import find_city, geocode
+from .media import parse_range
+from .normalize import PAST_GRACE, normalize_month, parse_date_info
+from .quota import reserve
+from .ratelimit import TokenBucket
+from .search_index import FestivalSearchIndex
+from .singleflight import SingleFlight, SingleFlightTimeout
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() instead of blocking"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("api.ratelimit.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_is_served_without_waiting(self):
+        bucket = TokenBucket(rate=2, capacity=4)
+        self.assertEqual([bucket.acquire() for _ in range(4)], [0.0] * 4)
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(bucket.stats()["throttled"], 0)
+
+    def test_empty_bucket_waits_one_token_interval(self):
+        bucket = TokenBucket(rate=2, capacity=1)
+        bucket.acquire()
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+    def test_refill_rate(self):
+        bucket = TokenBucket(rate=2, capacity=4)
+        for _ in range(4):
+            bucket.acquire()
+        self.clock.now += 1.0   # two tokens back
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+    def test_refill_is_capped_at_burst(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        bucket.acquire()
+        self.clock.now += 60.0
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+    def test_negative_tokens_space_queued_callers(self):
+        bucket = TokenBucket(rate=4, capacity=1)
+        bucket.acquire()
+        # Callers that arrive together reserve successive slots instead of all waking at once
+        with mock.patch.object(self.clock, "sleep"):
+            waits = [bucket.acquire() for _ in range(3)]
+        for wait, expected in zip(waits, [0.25, 0.5, 0.75]):
+            self.assertAlmostEqual(wait, expected)
+        self.assertAlmostEqual(bucket.tokens, -3)
+
+        stats = bucket.stats()
+        self.assertEqual(stats["acquired"], 4)
+        self.assertEqual(stats["throttled"], 3)
+        self.assertAlmostEqual(stats["max_wait_seconds"], 0.75)
+
+    def test_reservations_are_paid_back_by_refill(self):
+        bucket = TokenBucket(rate=4, capacity=1)
+        bucket.acquire()
+        with mock.patch.object(self.clock, "sleep"):
+            bucket.acquire()
+            bucket.acquire()
+        # Half a second later both reservations are covered and the bucket is empty again
+        self.clock.now += 0.5
+        self.assertAlmostEqual(bucket.acquire(), 0.25)
+
+
+class ServiceMetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, user=None, **headers):
+        request = self.factory.get("/api/metrics/", headers=headers)
+        request.user = user or SimpleNamespace(is_active=False, is_staff=False)
+        return views.service_metrics(request)
+
+    def test_anonymous_requests_get_404(self):
+        with mock.patch.object(views, "METRICS_TOKEN", None):
+            self.assertEqual(self.get().status_code, 404)
+            self.assertEqual(self.get(x_metrics_token="").status_code, 404)
+
+    def test_wrong_token_gets_404(self):
+        with mock.patch.object(views, "METRICS_TOKEN", "s3cret"):
+            self.assertEqual(self.get(x_metrics_token="guess").status_code, 404)
+
+    def test_metrics_token(self):
+        with mock.patch.object(views, "METRICS_TOKEN", "s3cret"):
+            response = self.get(x_metrics_token="s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("search_cache", json.loads(response.content))
+
+    def test_staff_session(self):
+        with mock.patch.object(views, "METRICS_TOKEN", None):
+            response = self.get(user=SimpleNamespace(is_active=True, is_staff=True))
+        self.assertEqual(response.status_code, 200)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_callers(self, flight, fn, count=8, timeout=None):
+        """Start `count` threads calling flight.do() on one key; returns each caller's outcome"""
+        outcomes = [None] * count
+
+        def caller(i):
+            try:
+                outcomes[i] = ("ok", flight.do("key", fn, timeout=timeout))
+            except Exception as e:
+                outcomes[i] = ("error", e)
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, outcomes
+
+    def blocking_fn(self, release, result=None, error=None):
+        calls = []
+        started = threading.Event()
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            if error is not None:
+                raise error
+            return result
+
+        return fn, calls, started
+
+    def wait_for_waiters(self, flight, count):
+        deadline = time.monotonic() + 5
+        while flight.stats()["coalesced"] < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_callers_share_one_run(self):
+        flight, release = SingleFlight(), threading.Event()
+        fn, calls, started = self.blocking_fn(release, result={"festivals": []})
+        threads, outcomes = self.run_callers(flight, fn)
+        started.wait(5)
+        self.wait_for_waiters(flight, 7)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({kind for kind, _ in outcomes}, {"ok"})
+        results = [result for _, (result, _) in outcomes]
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(sorted(shared for _, (_, shared) in outcomes), [False] + [True] * 7)
+        self.assertFalse(flight.is_running("key"))
+        self.assertEqual(flight.stats(), {"leaders": 1, "coalesced": 7, "timeouts": 0, "errors": 0, "in_flight": 0})
+
+    def test_leader_exception_reaches_every_caller(self):
+        flight, release = SingleFlight(), threading.Event()
+        error = RuntimeError("scrape failed")
+        fn, calls, started = self.blocking_fn(release, error=error)
+        threads, outcomes = self.run_callers(flight, fn, count=4)
+        started.wait(5)
+        self.wait_for_waiters(flight, 3)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(outcomes, [("error", error)] * 4)
+        self.assertEqual(flight.stats()["errors"], 1)
+
+    def test_waiter_times_out(self):
+        flight, release = SingleFlight(), threading.Event()
+        fn, calls, started = self.blocking_fn(release, result="late")
+        leader = threading.Thread(target=flight.do, args=("key", fn))
+        leader.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(SingleFlightTimeout):
+                flight.do("key", fn, timeout=0.01)
+            self.assertEqual(flight.stats()["timeouts"], 1)
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(len(calls), 1)
+
+    def test_key_is_free_again_after_a_run(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: 1), (1, False))
+        self.assertEqual(flight.do("key", lambda: 2), (2, False))
+
+
+class RecommendationCacheHitTests(SimpleTestCase):
+    def post(self, cache_entry, stored_ids=("f1",)):
+        cache = mock.Mock()
+        cache.get_entry.return_value = cache_entry
+
+        def store(festivals):
+            for fest, festival_id in zip(festivals, stored_ids):
+                fest["_id"] = festival_id
+
+        request = RequestFactory().post("/api/recommendations/", json.dumps({"location": "Goa", "month": "December"}),
+                                        content_type="application/json")
+        with mock.patch.object(views, "SEARCH_CACHE", cache), \
+                mock.patch.object(views, "store_festivals", side_effect=store) as store_festivals, \
+                mock.patch.object(views, "refresh_recommendations_in_background"):
+            response = views.get_recommendations(request)
+        return response, cache, store_festivals
+
+    def test_festivals_stored_on_a_hit_are_written_back(self):
+        response, cache, store_festivals = self.post(([{"title": "Sunburn"}], 60))
+        self.assertEqual(json.loads(response.content)["festivals"], [{"title": "Sunburn", "_id": "f1"}])
+        store_festivals.assert_called_once()
+        cache.set.assert_called_once_with(mock.ANY, [{"title": "Sunburn", "_id": "f1"}])
+
+    def test_hit_with_ids_writes_nothing(self):
+        response, cache, store_festivals = self.post(([{"title": "Sunburn", "_id": "f1"}], 60))
+        self.assertEqual(response.status_code, 200)
+        store_festivals.assert_not_called()
+        cache.set.assert_not_called()
+
+    def test_failed_store_is_not_written_back(self):
+        _, cache, _ = self.post(([{"title": "Sunburn"}], 60), stored_ids=())
+        cache.set.assert_not_called()
+
+    def test_stale_entry_is_left_to_the_refresh(self):
+        _, cache, store_festivals = self.post(([{"title": "Sunburn"}], 10 ** 6))
+        store_festivals.assert_called_once()
+        cache.set.assert_not_called()
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_range("bytes=0-9", 50), (0, 9))
+        self.assertEqual(parse_range("bytes=10-", 50), (10, 49))
+        self.assertEqual(parse_range("bytes=40-100", 50), (40, 49))
+
+    def test_suffix_ranges(self):
+        self.assertEqual(parse_range("bytes=-5", 50), (45, 49))
+        self.assertEqual(parse_range("bytes=-500", 50), (0, 49))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ("bytes=9-3", "bytes=100-", "bytes=50-", "bytes=-0"):
+            with self.subTest(header=header):
+                self.assertIs(parse_range(header, 50), False)
+
+    def test_unusable_headers_mean_the_whole_resource(self):
+        for header in (None, "", "bytes=-", "bytes=0-4,10-14", "items=0-4", "bytes=a-b"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 50))
+
+
+class FakeGridOut:
+    def __init__(self, data, content_type="audio/mpeg"):
+        self.data = data
+        self.length = len(data)
+        self.metadata = {"content_type": content_type}
+        self.position = 0
+        self.closed = False
+
+    def seek(self, position):
+        self.position = position
+
+    def read(self, size):
+        chunk = self.data[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class StreamMediaTests(SimpleTestCase):
+    media_id = "a" * 64
+    data = bytes(range(50))
+
+    def get(self, method="get", **headers):
+        self.media = FakeGridOut(self.data)
+        request = getattr(RequestFactory(), method)(f"/api/media/{self.media_id}/", headers=headers)
+        with mock.patch.object(views.media_store, "open", return_value=self.media):
+            return views.stream_media(request, self.media_id)
+
+    def test_full_response(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        self.assertEqual(response["ETag"], f'"{self.media_id}"')
+        self.assertEqual(response["Content-Length"], "50")
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+        self.assertTrue(self.media.closed)
+
+    def test_matching_etag_is_not_modified(self):
+        for value in (f'"{self.media_id}"', f'"other", "{self.media_id}"', "*"):
+            with self.subTest(if_none_match=value):
+                response = self.get(if_none_match=value)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response["ETag"], f'"{self.media_id}"')
+                self.assertTrue(self.media.closed)
+
+    def test_other_etag_gets_the_body(self):
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_range(self):
+        response = self.get(range="bytes=-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[45:])
+        self.assertEqual(response["Content-Range"], "bytes 45-49/50")
+        self.assertEqual(response["Content-Length"], "5")
+
+    def test_unsatisfiable_range(self):
+        response = self.get(range="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */50")
+        self.assertTrue(self.media.closed)
+
+    def test_if_range_with_current_etag_honours_the_range(self):
+        response = self.get(range="bytes=0-9", if_range=f'"{self.media_id}"')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[:10])
+
+    def test_if_range_with_another_validator_sends_everything(self):
+        for value in ('"other"', "Wed, 21 Oct 2015 07:28:00 GMT"):
+            with self.subTest(if_range=value):
+                response = self.get(range="bytes=0-9", if_range=value)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b"".join(response.streaming_content), self.data)
+
+    def test_head(self):
+        response = self.get(method="head", range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(response.content, b"")
+        self.assertTrue(self.media.closed)
+
+    def test_missing_media(self):
+        request = RequestFactory().get(f"/api/media/{self.media_id}/")
+        with mock.patch.object(views.media_store, "open", return_value=None):
+            self.assertEqual(views.stream_media(request, self.media_id).status_code, 404)
+
+
+class PreferenceSearchTests(SimpleTestCase):
+    account = {
+        "username": "maya", "email": "maya@example.com", "name": "Maya", "location": "Atlantis",
+        "preferences": ["jazz"], "premium": {"is_active": True, "is_pro": True, "plan": "monthly"},
+    }
+
+    def test_search_failure_is_a_503(self):
+        request = RequestFactory().get("/api/user/festival-preferences/")
+        request.principal = Principal(kind="user", id="0" * 24, document=self.account)
+        cursor = mock.MagicMock()
+        cursor.sort.return_value.skip.return_value.limit.return_value = cursor
+        cursor.__iter__.side_effect = OperationFailure("text index required for $text query")
+
+        with mock.patch.object(users, "festival_collection") as festivals:
+            festivals.find.return_value = cursor
+            response = users.get_festivals_by_user_preference(request)
+
+        self.assertEqual(response.status_code, 503)
+        festivals.create_indexes.assert_not_called()
+
+    @staticmethod
+    def location_matches(fest, query):
+        """The location part of a preference query ($text is left to MongoDB)"""
+        branches = query.get("$or") or [{key: value for key, value in query.items() if key != "$text"}]
+        for branch in branches:
+            if "city_id" in branch and fest.get("city_id") == branch["city_id"]:
+                return True
+            if "location" in branch and re.search(branch["location"]["$regex"], fest.get("location", ""), re.I):
+                return True
+        return False
+
+    def titles_near(self, location, stored):
+        request = RequestFactory().get("/api/user/festival-preferences/")
+        request.principal = Principal(kind="user", id="0" * 24, document={**self.account, "location": location})
+
+        def find(query, fields):
+            cursor = mock.MagicMock()
+            cursor.sort.return_value.skip.return_value.limit.return_value = [
+                {"_id": ObjectId(), **fest} for fest in stored if self.location_matches(fest, query)
+            ]
+            return cursor
+
+        with mock.patch.object(users, "festival_collection") as festivals:
+            festivals.find.side_effect = find
+            response = users.get_festivals_by_user_preference(request)
+        return sorted(fest["title"] for fest in json.loads(response.content)["festivals"])
+
+    def test_known_city_also_matches_festivals_without_city_id(self):
+        stored = [
+            {"title": "Jazz by the Bay", "location": "Bandra, Mumbai", "city_id": "in-mumbai"},
+            # Stored before the normalize_festivals backfill
+            {"title": "Old Jazz Night", "location": "Mumbai"},
+            # Organizer venue the gazetteer can't place, under an alias of the city
+            {"title": "Bombay Jazz Club", "location": "Blue Frog, Bombay"},
+            {"title": "Pune Jazz", "location": "Pune", "city_id": "in-pune"},
+        ]
+        self.assertEqual(self.titles_near("Mumbai", stored), ["Bombay Jazz Club", "Jazz by the Bay", "Old Jazz Night"])
+
+    def test_unknown_place_is_a_substring_match(self):
+        stored = [{"title": "Deep Jazz", "location": "Atlantis Bay"}, {"title": "Jazz", "location": "Lemuria"}]
+        self.assertEqual(self.titles_near("Atlantis", stored), ["Deep Jazz"])
+
+
+class FindCityTests(SimpleTestCase):
+    def city_id(self, location):
+        city = find_city(location)
+        return city and city["id"]
+
+    def test_names_and_aliases(self):
+        self.assertEqual(self.city_id("Bangalore"), "in-bengaluru")
+        self.assertEqual(self.city_id("bengaluru, Karnataka"), "in-bengaluru")
+        self.assertEqual(self.city_id("São Paulo"), "br-sao-paulo")
+        self.assertEqual(self.city_id("Rio de Janeiro, Brazil"), "br-rio-de-janeiro")
+
+    def test_longest_phrase_wins(self):
+        self.assertEqual(self.city_id("New Delhi"), "in-delhi")
+        self.assertEqual(self.city_id("Navi Mumbai"), "in-mumbai")
+
+    def test_later_parts_win(self):
+        # venue, city, country
+        self.assertEqual(self.city_id("Vagator, Goa"), "in-goa")
+        self.assertEqual(self.city_id("Rock in Rio, Lisbon"), "pt-lisbon")
+        self.assertEqual(self.city_id("Jaipur Literature Festival, Diggi Palace, Jaipur, India"), "in-jaipur")
+        self.assertEqual(self.city_id("Paris Café, London, UK"), "gb-london")
+
+    def test_later_words_win_within_a_part(self):
+        self.assertEqual(self.city_id("Rock in Rio Lisbon"), "pt-lisbon")
+        self.assertEqual(self.city_id("Berlin Calling Amsterdam"), "nl-amsterdam")
+
+    def test_ambiguous_words_are_not_cities(self):
+        self.assertIsNone(find_city("Rio Grande, Texas"))
+        self.assertIsNone(find_city("Tomorrowland Winter, Alpe d'Huez"))
+        self.assertIsNone(find_city(""))
+        self.assertIsNone(find_city(None))
+
+    def test_geocode(self):
+        self.assertEqual(geocode("Lisboa")["type"], "Point")
+        self.assertIsNone(geocode("Atlantis"))
+
+
+class FakeFestivalCollection:
+    """Just enough of a collection for FestivalStore: fingerprint upserts and $in lookups"""
+
+    def __init__(self):
+        self.documents = []
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            fingerprint = operation._filter["fingerprint"]
+            if not any(doc.get("fingerprint") == fingerprint for doc in self.documents):
+                self.documents.append({"_id": ObjectId(), **operation._doc["$setOnInsert"]})
+
+    def find(self, query, fields=None):
+        fingerprints = query["fingerprint"]["$in"]
+        return [doc for doc in self.documents if doc.get("fingerprint") in fingerprints]
+
+
+class StoreFestivalsTests(SimpleTestCase):
+    scraped = {"title": "Sunburn Festival", "url": "https://www.sunburn.in/goa/", "location": "Vagator, Goa",
+               "month": "Dec", "date_info": "Dec 28-30, 2025"}
+
+    def setUp(self):
+        self.collection = FakeFestivalCollection()
+        patcher = mock.patch.object(views, "festival_store", FestivalStore(self.collection))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_festival_is_stored_once(self):
+        first, second = dict(self.scraped), dict(self.scraped)
+        views.store_festivals([first])
+        views.store_festivals([second])
+        self.assertEqual(len(self.collection.documents), 1)
+        self.assertEqual(first["_id"], second["_id"])
+        self.assertEqual(self.collection.documents[0]["month"], "December")
+        self.assertEqual(self.collection.documents[0]["city_id"], "in-goa")
+
+    def test_festivals_stored_before_normalization_are_found_again(self):
+        # What store_festivals did before festivals were normalized on the way in
+        stored_id = FestivalStore(self.collection).upsert_many([dict(self.scraped)])[0]
+        fest = dict(self.scraped)
+        views.store_festivals([fest])
+        self.assertEqual(len(self.collection.documents), 1)
+        self.assertEqual(fest["_id"], stored_id)
+
+    def test_month_filled_in_from_date_info(self):
+        scraped = {**self.scraped, "month": ""}
+        first, second = dict(scraped), dict(scraped)
+        views.store_festivals([first])
+        self.assertEqual(first["month"], "December")
+        views.store_festivals([second])
+        self.assertEqual(len(self.collection.documents), 1)
+
+
+class NormalizeMonthTests(SimpleTestCase):
+    def test_names_abbreviations_and_numbers(self):
+        for value in ("Dec", "december", " DECEMBER ", "12", 12):
+            with self.subTest(value=value):
+                self.assertEqual(normalize_month(value), "December")
+        self.assertEqual(normalize_month("sept"), "September")
+        self.assertEqual(normalize_month("03"), "March")
+
+    def test_unknown_values(self):
+        for value in (None, "", "Smarch", "0", "13", 13):
+            with self.subTest(value=value):
+                self.assertIsNone(normalize_month(value))
+
+
+class ParseDateInfoTests(SimpleTestCase):
+    reference = datetime(2025, 6, 1)
+
+    def parse(self, text, reference=None):
+        return parse_date_info(text, reference or self.reference)
+
+    def test_explicit_years(self):
+        self.assertEqual(self.parse("12-15 Dec 2025"), (datetime(2025, 12, 12), datetime(2025, 12, 15)))
+        self.assertEqual(self.parse("2025-12-12"), (datetime(2025, 12, 12), datetime(2025, 12, 12)))
+        # An explicit year is kept even when it is long past
+        self.assertEqual(self.parse("Jan 5-7, 2024"), (datetime(2024, 1, 5), datetime(2024, 1, 7)))
+
+    def test_year_inferred_from_reference(self):
+        self.assertEqual(self.parse("Dec 12-15"), (datetime(2025, 12, 12), datetime(2025, 12, 15)))
+
+    def test_bare_month_is_the_whole_month(self):
+        self.assertEqual(self.parse("August"), (datetime(2025, 8, 1), datetime(2025, 8, 31)))
+
+    def test_range_wrapping_into_next_year(self):
+        self.assertEqual(self.parse("Dec 30 - Jan 2"), (datetime(2025, 12, 30), datetime(2026, 1, 2)))
+        self.assertEqual(self.parse("Dec 30, 2025 - Jan 2, 2026"), (datetime(2025, 12, 30), datetime(2026, 1, 2)))
+
+    def test_past_grace_rolls_inferred_dates_forward(self):
+        cutoff = self.reference - PAST_GRACE
+        # Ended within the grace period: still this year's edition
+        self.assertGreaterEqual(datetime(2025, 4, 12), cutoff)
+        self.assertEqual(self.parse("April 10 - 12"), (datetime(2025, 4, 10), datetime(2025, 4, 12)))
+        # Ended before it: next year's
+        self.assertLess(datetime(2025, 3, 3), cutoff)
+        self.assertEqual(self.parse("Mar 1-3"), (datetime(2026, 3, 1), datetime(2026, 3, 3)))
+        self.assertEqual(self.parse("Mar 1-3", datetime(2025, 4, 15)), (datetime(2025, 3, 1), datetime(2025, 3, 3)))
+
+    def test_text_without_dates(self):
+        for text in (None, "", "03", "19:30", "3rd Friday", "Every weekend"):
+            with self.subTest(text=text):
+                self.assertEqual(self.parse(text), (None, None))
+
+
+class FakeUsersCollection:
+    """One user document and the filters quota.reserve/release send to find_one_and_update"""
+    COMPARISONS = {"$lt": operator.lt, "$gt": operator.gt}
+
+    def __init__(self, user):
+        self.user = user
+        self.writes = 0
+
+    def matches(self, query):
+        for field, condition in query.items():
+            if field == "$or":
+                if not any(self.matches(branch) for branch in condition):
+                    return False
+            elif not isinstance(condition, dict):
+                if self.user.get(field) != condition:
+                    return False
+            else:
+                for op, value in condition.items():
+                    if op == "$exists":
+                        if (field in self.user) != value:
+                            return False
+                    elif field not in self.user or not self.COMPARISONS[op](self.user[field], value):
+                        return False
+        return True
+
+    def find_one_and_update(self, query, update, projection=None, return_document=None):
+        if not self.matches(query):
+            return None
+        self.writes += 1
+        for field, amount in update["$inc"].items():
+            self.user[field] = self.user.get(field, 0) + amount
+        return dict(self.user)
+
+
+class QuotaTests(SimpleTestCase):
+    def users(self, **fields):
+        return FakeUsersCollection({"_id": ObjectId(), **fields})
+
+    def test_missing_counter_counts_as_zero(self):
+        users = self.users()
+        self.assertIsNotNone(reserve(users, users.user["_id"], "video", None))
+        self.assertEqual(users.user["video_usage"], 1)
+
+    def test_limit_is_enforced(self):
+        users = self.users()
+        self.assertIsNotNone(reserve(users, users.user["_id"], "voice", None))
+        self.assertIsNotNone(reserve(users, users.user["_id"], "voice", None))
+        self.assertIsNone(reserve(users, users.user["_id"], "voice", None))
+        self.assertEqual(users.user["voice_usage"], 2)
+
+    def test_at_the_limit_nothing_is_written(self):
+        users = self.users(video_usage=2)
+        self.assertIsNone(reserve(users, users.user["_id"], "video", "monthly"))
+        self.assertEqual(users.writes, 0)
+
+    def test_unknown_plan_gets_the_free_limit(self):
+        users = self.users(video_usage=1)
+        self.assertIsNone(reserve(users, users.user["_id"], "video", "lifetime"))
+
+    def test_unlimited_plans_are_not_counted(self):
+        users = self.users(voice_usage=40)
+        reservation = reserve(users, users.user["_id"], "voice", "yearly")
+        self.assertIsNotNone(reservation)
+        reservation.release()
+        self.assertEqual(users.user["voice_usage"], 40)
+        self.assertEqual(users.writes, 0)
+
+    def test_release_is_idempotent(self):
+        users = self.users(video_usage=1)
+        reservation = reserve(users, users.user["_id"], "video", "yearly")
+        self.assertEqual(users.user["video_usage"], 2)
+        reservation.release()
+        reservation.release()
+        self.assertEqual(users.user["video_usage"], 1)
+
+    def test_release_never_goes_below_zero(self):
+        users = self.users()
+        reservation = reserve(users, users.user["_id"], "video", None)
+        users.user["video_usage"] = 0   # reset by someone else meanwhile
+        reservation.release()
+        self.assertEqual(users.user["video_usage"], 0)
+
+
+class TavusVideoTests(SimpleTestCase):
+    festival_id = str(ObjectId())
+
+    def setUp(self):
+        self.festivals = mock.Mock()
+        self.festivals.find_one.return_value = {"title": "Sunburn", "ai_voice_data": {"en": {"script": "Hello"}}}
+        self.reservation = mock.Mock()
+        for name, value in (("festival_collection", self.festivals),
+                            ("reserve", mock.Mock(return_value=self.reservation))):
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, created, status=None):
+        request = RequestFactory().post("/api/generate-tavus-video/", json.dumps({"_id": self.festival_id}),
+                                        content_type="application/json")
+        request.principal = Principal(kind="user", id=str(ObjectId()), document={"video_usage": 0})
+        with mock.patch.object(views.http_client, "post", return_value=created), \
+                mock.patch.object(views.http_client, "get", side_effect=[status]):
+            return views.generate_tavus_video(request)
+
+    def response(self, status_code=200, body=None, text=""):
+        response = mock.Mock(status_code=status_code, text=text)
+        if isinstance(body, Exception):
+            response.json.side_effect = body
+        else:
+            response.json.return_value = body
+        return response
+
+    def test_non_json_creation_response_releases_the_reservation(self):
+        response = self.post(self.response(body=ValueError("Expecting value"), text="<html>"))
+        self.assertEqual(response.status_code, 502)
+        self.reservation.release.assert_called_once()
+
+    def test_missing_video_id_releases_the_reservation(self):
+        response = self.post(self.response(body=["unexpected"]))
+        self.assertEqual(response.status_code, 500)
+        self.reservation.release.assert_called_once()
+
+    def test_failed_status_check_keeps_the_started_video(self):
+        for status in (requests.exceptions.ConnectionError("reset"),
+                       self.response(body=ValueError("Expecting value")),
+                       self.response(status_code=503)):
+            with self.subTest(status=status):
+                self.festivals.update_one.reset_mock()
+                response = self.post(self.response(body={"video_id": "v1"}), status)
+                self.assertEqual(response.status_code, 202)
+                self.reservation.release.assert_not_called()
+                update = self.festivals.update_one.call_args[0][1]["$set"]
+                self.assertEqual(update["ai_video_data.en.video_id"], "v1")
+
+    def test_completed_video(self):
+        status = self.response(body={"status": "completed", "video_url": "https://tavus.video/v1.mp4"})
+        response = self.post(self.response(body={"video_id": "v1"}), status)
+        self.assertEqual(json.loads(response.content), {"video_url": "https://tavus.video/v1.mp4"})
+
+
+class SourceTimingsTests(SimpleTestCase):
+    def outcome(self, source, elapsed, throttled=0.0, error=None):
+        return {"key": (source, "https://example.com"), "elapsed": elapsed, "throttled": throttled, "error": error}
+
+    def test_summaries_are_recorded_per_source_and_phase(self):
+        timings = SourceTimings()
+        group = lambda key: key[0]
+        timings.record({
+            "listing": summarize_timings([self.outcome("Eventbrite", 1.5, 0.5), self.outcome("Eventbrite", 2.0, error="timeout")], group),
+            "detail": summarize_timings([self.outcome("Eventbrite", 0.75)], group),
+        })
+        timings.record({"listing": summarize_timings([self.outcome("Eventbrite", 1.0)], group)})
+
+        listing = timings.stats()["Eventbrite"]["listing"]
+        self.assertEqual(listing["runs"], 2)
+        self.assertEqual(listing["jobs"], 3)
+        self.assertEqual(listing["errors"], 1)
+        self.assertEqual(listing["elapsed"], 3.0)
+        self.assertEqual(listing["throttled"], 0.5)
+        self.assertEqual(listing["max_elapsed"], 2.0)
+        self.assertEqual(listing["last"], {"jobs": 1, "errors": 0, "elapsed": 1.0, "throttled": 0.0})
+        self.assertEqual(timings.stats()["Eventbrite"]["detail"]["runs"], 1)
+
+    def test_reported_by_the_metrics_view(self):
+        request = RequestFactory().get("/api/metrics/")
+        request.user = SimpleNamespace(is_active=True, is_staff=True)
+        self.assertIn("scraper_sources", json.loads(views.service_metrics(request).content))
+
+
+class SearchMonthTests(SimpleTestCase):
+    festivals = [
+        {"_id": ObjectId(), "title": "Sunburn", "month": "December", "fetched_at": datetime(2025, 6, 1)},
+        # Stored before months were normalized
+        {"_id": ObjectId(), "title": "Hornbill", "month": "Dec", "fetched_at": datetime(2024, 6, 1)},
+        {"_id": ObjectId(), "title": "Holi Moo", "month": "03", "fetched_at": datetime(2024, 6, 1)},
+    ]
+
+    def setUp(self):
+        collection = mock.Mock()
+        collection.find.return_value = self.festivals
+        self.index = FestivalSearchIndex(collection, refresh_seconds=3600)
+        patcher = mock.patch.object(views, "festival_search", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, **params):
+        response = views.search_festivals(RequestFactory().get("/api/festivals/search/", params))
+        return response.status_code, json.loads(response.content)
+
+    def titles(self, month):
+        status, body = self.search(month=month)
+        self.assertEqual(status, 200)
+        return sorted(hit["title"] for hit in body["results"])
+
+    def test_any_spelling_of_a_month_matches_every_stored_spelling(self):
+        for month in ("December", "dec", "12"):
+            with self.subTest(month=month):
+                self.assertEqual(self.titles(month), ["Hornbill", "Sunburn"])
+        self.assertEqual(self.titles("March"), ["Holi Moo"])
+
+    def test_month_facets_use_canonical_names(self):
+        _, body = self.search()
+        self.assertEqual(body["facets"]["month"], {"December": 2, "March": 1})
+
+    def test_unknown_month_is_a_400(self):
+        status, _ = self.search(month="Smarch")
+        self.assertEqual(status, 400)
+
+
+class DeletedAccountTests(SimpleTestCase):
+    """Access tokens are trusted from their claims, so they can outlive the account"""
+
+    def get(self, view, load_account):
+        request = RequestFactory().get("/api/user/profile/")
+        request.principal = Principal(kind="user", id=str(ObjectId()), username="maya",
+                                      claims={"typ": "access", "user_id": "x"})
+        with mock.patch("api.auth.load_account", load_account):
+            return view(request)
+
+    def test_deleted_user_is_a_404(self):
+        for view in (users.verify_token, users.user_profile, users.get_festivals_by_user_preference):
+            with self.subTest(view=view.__name__):
+                response = self.get(view, mock.Mock(return_value=None))
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(json.loads(response.content)["error"], "User not found")
+
+    def test_verify_token_still_reports_invalid(self):
+        response = self.get(users.verify_token, mock.Mock(return_value=None))
+        self.assertIs(json.loads(response.content)["valid"], False)
+
+    def test_lookup_failure_is_a_503(self):
+        response = self.get(users.user_profile, mock.Mock(side_effect=ServerSelectionTimeoutError("down")))
+        self.assertEqual(response.status_code, 503)
+
+    def test_existing_user(self):
+        account = {"_id": ObjectId(), "username": "maya", "email": "maya@example.com"}
+        response = self.get(users.verify_token, mock.Mock(return_value=account))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["user"]["username"], "maya")
+
+
+class QuotaGateClaimsTests(SimpleTestCase):
+    """Access-token claims may be stale across workers, so gates read the user document"""
+
+    def principal(self):
+        # Claims say yearly with nothing used; the document (as another worker left it) says free, used up
+        claims = {"typ": "access", "user_id": "x", "usage_epoch": 10 ** 6, "voice_usage": 0, "video_usage": 0,
+                  "premium": {"plan": "yearly", "is_active": True}}
+        return Principal(kind="user", id=str(ObjectId()), claims=claims,
+                         document={"_id": ObjectId(), "voice_usage": 2, "video_usage": 1, "premium": {}})
+
+    def test_video_gate_uses_the_document(self):
+        request = RequestFactory().post("/api/generate-tavus-video/", json.dumps({"_id": str(ObjectId())}),
+                                        content_type="application/json")
+        request.principal = self.principal()
+        with mock.patch.object(views, "reserve") as reserve:
+            response = views.generate_tavus_video(request)
+        self.assertEqual(response.status_code, 403)
+        reserve.assert_not_called()
+
+    def test_status_is_answered_from_the_claims(self):
+        request = RequestFactory().get("/api/subscription/status/")
+        request.principal = self.principal()
+        body = json.loads(users.subscription_status(request).content)
+        self.assertEqual(body["plan"], "yearly")
+        self.assertEqual(body["video_usage"], 0)
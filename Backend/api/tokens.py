@@ -0,0 +1,156 @@
+"""
+Short-lived access tokens with signed subscription claims.
+
+The session token from login/signup lives 7 days, and requests made with it
+resolve the user from MongoDB (through the principal cache in api/auth.py).
+POST /api/user/token/refresh/ trades it for an access token that lives
+FESTIFLY_ACCESS_TOKEN_MINUTES and carries the plan, subscription expiry and
+usage counters, so subscription status can be answered from the token alone.
+
+Those claims can lag behind the database. Every usage or plan change bumps
+usage_epoch on the user document, and a token stamped with an older epoch
+than this process has seen is not trusted (callers fall back to the
+document). Epochs are only known per process, though: after a change made
+through another worker, status read from the token stays stale until the
+token is refreshed or expires, i.e. for up to ACCESS_TOKEN_MINUTES. So the
+claims only answer read-only status; the voice and video gates, which
+spend quota, always read the plan from the user document. Clients refresh
+after payment_success and after generating a briefing or video.
+"""
+import calendar
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from pymongo import ReturnDocument
+
+from .auth import ACCESS_TOKEN_TYPE, SECRET_KEY, invalidate_principal
+from .subscriptions import IST_OFFSET, check_subscription_expiry
+
+ACCESS_TOKEN_MINUTES = float(os.environ.get('FESTIFLY_ACCESS_TOKEN_MINUTES', 15))
+
+# user id -> newest usage_epoch this process has written or read
+_known_epochs = {}
+_epochs_lock = threading.Lock()
+
+
+def record_usage_epoch(user_id, epoch):
+    with _epochs_lock:
+        if epoch > _known_epochs.get(str(user_id), 0):
+            _known_epochs[str(user_id)] = epoch
+
+
+def claims_are_current(claims):
+    """True for an access token whose usage_epoch is not older than one seen by this process"""
+    if claims.get("typ") != ACCESS_TOKEN_TYPE:
+        return False
+    with _epochs_lock:
+        known = _known_epochs.get(str(claims.get("user_id")), 0)
+    return claims.get("usage_epoch", 0) >= known
+
+
+def bump_usage(users_collection, user_id, field=None, amount=1, extra_update=None, conditions=None):
+    """
+    Increment a usage counter (if `field` is given) and usage_epoch in one
+    write, apply `extra_update` alongside, and drop cached copies of the
+    user. With `conditions`, only a document also matching them is updated.
+    Returns the updated document without its password, or None if none matched.
+    """
+    update = dict(extra_update or {})
+    increments = {"usage_epoch": 1}
+    if field:
+        increments[field] = amount
+    update["$inc"] = increments
+    user = users_collection.find_one_and_update(
+        {"_id": user_id, **(conditions or {})}, update,
+        projection={"password": 0}, return_document=ReturnDocument.AFTER,
+    )
+    if user:
+        invalidate_principal(user_id)
+        record_usage_epoch(user_id, user.get("usage_epoch", 0))
+    return user
+
+
+def _epoch_seconds(ist_naive):
+    return calendar.timegm((ist_naive - IST_OFFSET).timetuple())
+
+
+def subscription_claims(user):
+    premium = check_subscription_expiry(user).get("premium") or {}
+    expires_at = premium.get("expires_at")
+    return {
+        "plan": premium.get("plan") if premium.get("is_active") else None,
+        "premium": {
+            "plan": premium.get("plan"),
+            "is_active": bool(premium.get("is_active")),
+            "expired": bool(premium.get("expired")),
+            "is_pro": bool(premium.get("is_pro")),
+            "is_plus": bool(premium.get("is_plus")),
+            "expires_at": _epoch_seconds(expires_at) if isinstance(expires_at, datetime) else None,
+        },
+        "voice_usage": user.get("voice_usage", 0),
+        "video_usage": user.get("video_usage", 0),
+        "usage_epoch": user.get("usage_epoch", 0),
+    }
+
+
+def issue_access_token(user):
+    now = datetime.utcnow()
+    payload = {
+        "typ": ACCESS_TOKEN_TYPE,
+        "user_id": str(user["_id"]),
+        "username": user.get("username"),
+        "email": user.get("email"),
+        **subscription_claims(user),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_MINUTES),
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+
+
+def access_token_response(user):
+    return {
+        "access_token": issue_access_token(user),
+        "token_type": "Bearer",
+        "expires_in": int(ACCESS_TOKEN_MINUTES * 60),
+    }
+
+
+def premium_from_claims(claims):
+    """The premium subdocument as of now, rebuilt from an access token's claims"""
+    premium = dict(claims.get("premium") or {})
+    expires_at = premium.get("expires_at")
+    if expires_at is not None:
+        if premium.get("is_active") and expires_at < time.time():
+            premium["is_active"] = False
+            premium["expired"] = True
+        premium["expires_at"] = datetime.utcfromtimestamp(expires_at) + IST_OFFSET
+    return premium
+
+
+def subscription_snapshot(principal, use_claims=True):
+    """
+    {"premium", "voice_usage", "video_usage"} for a user principal: from the
+    token's claims when they are current (see above for how stale that can
+    be), otherwise from the user document. Gates pass use_claims=False.
+    """
+    if use_claims and claims_are_current(principal.claims):
+        claims = principal.claims
+        return {
+            "premium": premium_from_claims(claims),
+            "voice_usage": claims.get("voice_usage", 0),
+            "video_usage": claims.get("video_usage", 0),
+        }
+    user = check_subscription_expiry(principal.account)
+    return {
+        "premium": user.get("premium") or {},
+        "voice_usage": user.get("voice_usage", 0),
+        "video_usage": user.get("video_usage", 0),
+    }
+
+
+def active_plan_of(snapshot):
+    premium = snapshot["premium"]
+    return premium.get("plan") if premium.get("is_active") else None
@@ -8,11 +8,15 @@ urlpatterns = [
     path("festival-detail/", get_festival_by_id, name="get_festival_by_id"),
     path('smart-planner/', smart_planner, name='ai_travel_suggestions'),   
     path('get-all-festivals/', get_all_festivals, name='get_all_festivals'), 
+    path('search/', search_festivals, name='search_festivals'),
+    path('festivals/near/', festivals_near, name='festivals_near'),
     path("fetch-reddit-reviews/", fetch_reddit_reviews_by_id, name="fetch_reddit_reviews"),
     path("enhance-festival-ai/", enhance_festival_ai, name="enhance_festival_ai"),
     path("generate-voice-briefing/", generate_voice_briefing, name="generate_voice_briefing"),
     path("generate-ai-video/", generate_ai_video, name="generate_ai_video"),
     path('subscription/status/', subscription_status, name='subscription_status'),
+    path('metrics/', service_metrics, name='service_metrics'),
+    path('media/<str:media_id>/', stream_media, name='stream_media'),
 
     #organizer urls
     path('organizer/signup/', organizer_signup, name='organizer-signup'), 
@@ -35,6 +39,7 @@ urlpatterns = [
     path('user/update-profile/', update_profile, name='update-profile'),
     path('user/apply-referral/', apply_referral, name='apply-referral'),
     path('user/google-auth/', google_auth, name='google-auth'),
+    path('user/token/refresh/', refresh_access_token, name='refresh-access-token'),
 
 
     #test urls
@@ -1,4 +1,5 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework.decorators import api_view
 import praw, requests
 from textblob import TextBlob
@@ -7,9 +8,7 @@ import requests
 from datetime import datetime
 import re
 from django.views.decorators.csrf import csrf_exempt
-from pymongo import MongoClient
 import json
-import copy
 from pymongo.errors import PyMongoError
 import google.generativeai as genai
 from bson.objectid import ObjectId
@@ -17,17 +16,41 @@ import time
 from duckduckgo_search import DDGS
 from bs4 import BeautifulSoup
 import time
+import base64
+import hmac
+import logging
+import math
 import random
-import jwt
+import threading
 from django.conf import settings
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from urllib.parse import urljoin
+from . import http_client
+from .adaptive_pool import AdaptiveConcurrencyPool, is_quota_error
+from .ai_cache import NormalizedEventCache, event_cache_key
+from .auth import authenticate, principal_cache
+from .cache import build_cache_backend, stable_key
+from .db import get_db
+from .festival_store import FestivalStore, festival_fingerprint
+from .media import MediaStore, iter_chunks, parse_range
+from .passwords import password_pool
+from .projections import briefing_projection, is_valid_language, parse_fields, projection
+from .quota import limit_message, remaining, reserve
+from .search_index import FestivalSearchIndex
+from .geo import bbox_polygon, find_city, geo_point
+from .indexes import FESTIVAL_GEO_INDEX
+from .normalize import normalize_festival, normalize_month
+from .singleflight import SingleFlight, SingleFlightTimeout
+from .tokens import active_plan_of, subscription_snapshot
+from .fetch_engine import polite_get, run_concurrently, source_timings, summarize_timings
+from .ratelimit import rate_limiter
 
 load_dotenv() 
 
+logger = logging.getLogger(__name__)
+
 # Load secrets from environment variables
-SECRET_KEY = os.environ.get('FESTIFLY_SECRET_KEY', 'FetiFly')
-MONGODB_URI = os.environ.get('FESTIFLY_MONGODB_URI')
 REDDIT_CLIENT_ID = os.environ.get('FESTIFLY_REDDIT_CLIENT_ID')
 REDDIT_CLIENT_SECRET = os.environ.get('FESTIFLY_REDDIT_CLIENT_SECRET')
 REDDIT_USER_AGENT = os.environ.get('FESTIFLY_REDDIT_USER_AGENT', 'festifly-agent')
@@ -35,13 +58,21 @@ GEMINI_API_KEY = os.environ.get('FESTIFLY_GEMINI_API_KEY')
 HEYGEN_API_KEY = os.environ.get('FESTIFLY_HEYGEN_API_KEY')
 FESTIFLY_TAVUS_API_KEY = os.environ.get('FESTIFLY_TAVUS_API_KEY')
 
-# MongoDB setup
-if not MONGODB_URI:
-    raise Exception('FESTIFLY_MONGODB_URI environment variable not set!')
-client = MongoClient(MONGODB_URI)
-db = client['festifly']
+# MongoDB setup (shared client, see api/db.py)
+db = get_db()
 festival_collection = db['festivals']
 users_collection = db['users']
+festival_store = FestivalStore(festival_collection)
+media_store = MediaStore(db)
+festival_search = FestivalSearchIndex(
+    festival_collection,
+    refresh_seconds=float(os.environ.get('FESTIFLY_SEARCH_INDEX_REFRESH_SECONDS', 30)),
+    rebuild_seconds=float(os.environ.get('FESTIFLY_SEARCH_INDEX_REBUILD_SECONDS', 3600)),
+)
+ai_event_cache = NormalizedEventCache(
+    db['ai_event_cache'],
+    ttl_days=float(os.environ.get('FESTIFLY_AI_CACHE_TTL_DAYS', 30)),
+)
 
 # -------------------------------------------------- Utilities -------------------------------------------------
 # Set up Reddit API client
@@ -60,6 +91,20 @@ if not GEMINI_API_KEY:
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel("gemini-2.0-flash")
 
+# Raw events normalized per Gemini prompt (1 = one prompt per event)
+GEMINI_BATCH_SIZE = int(os.environ.get('FESTIFLY_GEMINI_BATCH_SIZE', 10))
+# How many times events dropped from a batch response are re-submitted, one prompt per event
+GEMINI_BATCH_RETRIES = int(os.environ.get('FESTIFLY_GEMINI_BATCH_RETRIES', 2))
+
+# Concurrent Gemini normalization calls; the pool grows towards the max while
+# calls stay healthy and halves its limit on 429 / quota errors
+gemini_pool = AdaptiveConcurrencyPool(
+    "gemini",
+    initial=int(os.environ.get('FESTIFLY_GEMINI_INITIAL_CONCURRENCY', 2)),
+    maximum=int(os.environ.get('FESTIFLY_GEMINI_MAX_CONCURRENCY', 8)),
+    latency_target=float(os.environ.get('FESTIFLY_GEMINI_LATENCY_TARGET', 20)),
+)
+
 # You can expand this to include more search sources
 SEARCH_SOURCES = ["festivals", "events", "concerts", "cultural events"]
 
@@ -69,25 +114,42 @@ RELEVANT_SUBREDDITS = ["Festivals", "IndiaTravel", "travel", "backpacking", "fes
 # Headers for web scraping
 HEADERS = {"User-Agent": "FestiflyBot/0.1"}
 
-# Simple in-memory cache for search results
-SEARCH_CACHE = {}
-CACHE_EXPIRY_MINUTES = 30
+# Cache for search results: "mongo" and "file" are shared by every worker, "memory" is a per-process LRU.
+# Entries are fresh for CACHE_EXPIRY_MINUTES; after that they are still served (stale-while-revalidate)
+# while one background refresh runs, until CACHE_MAX_STALE_MINUTES when the backend drops them.
+CACHE_EXPIRY_MINUTES = int(os.environ.get('FESTIFLY_SEARCH_CACHE_FRESH_MINUTES', 30))
+CACHE_MAX_STALE_MINUTES = max(CACHE_EXPIRY_MINUTES, int(os.environ.get('FESTIFLY_SEARCH_CACHE_MAX_STALE_MINUTES', 6 * 60)))
+SEARCH_CACHE = build_cache_backend(
+    os.environ.get('FESTIFLY_SEARCH_CACHE_BACKEND', 'mongo'),
+    ttl_seconds=CACHE_MAX_STALE_MINUTES * 60,
+    collection=db['recommendation_cache'],
+    directory=os.environ.get('FESTIFLY_SEARCH_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'recommendations')),
+    max_entries=int(os.environ.get('FESTIFLY_SEARCH_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('FESTIFLY_SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+)
 
-def clean_cache():
-    """Clean expired cache entries"""
-    current_time = datetime.utcnow()
-    expired_keys = []
-    
-    for key, data in SEARCH_CACHE.items():
-        time_diff = (current_time - data['timestamp']).total_seconds() / 60
-        if time_diff >= CACHE_EXPIRY_MINUTES:
-            expired_keys.append(key)
-    
-    for key in expired_keys:
-        del SEARCH_CACHE[key]
-    
-    if expired_keys:
-        print(f"Cleaned {len(expired_keys)} expired cache entries")
+# Concurrent requests for the same query share one scrape; duplicates give up after this long
+RECOMMENDATION_FLIGHTS = SingleFlight()
+SINGLEFLIGHT_TIMEOUT_SECONDS = float(os.environ.get('FESTIFLY_SINGLEFLIGHT_TIMEOUT', 120))
+
+# Shared secret for /api/metrics/ (sent as X-Metrics-Token); unset means staff sessions only
+METRICS_TOKEN = os.environ.get('FESTIFLY_METRICS_TOKEN')
+
+STALE_REFRESH_LOCK = threading.Lock()
+STALE_REFRESHING = set()
+STALE_REFRESH_METRICS = {"stale_served": 0, "refreshes_started": 0, "refreshes_failed": 0}
+
+def recommendation_cache_key(location, month, interests):
+    """
+    Same query, same key - in every worker process and across restarts. Locations and
+    months are canonicalized, so "Bangalore"/"Bengaluru" or "Dec"/"December" share an entry.
+    """
+    city = find_city(location)
+    return stable_key({
+        "location": city["id"] if city else " ".join(location.lower().split()),
+        "month": normalize_month(month) or month.strip().lower(),
+        "interests": sorted({interest.strip().lower() for interest in interests}),
+    })
 
 def get_post_vibe(permalink):
     try:
@@ -124,7 +186,7 @@ def fetch_duckduckgo_festivals(location, interests, month):
                 'Sec-Fetch-Mode': 'navigate',
             }
             
-            response = requests.get(event_url, headers=headers, timeout=15, allow_redirects=True)
+            response = polite_get(event_url, headers=headers, timeout=15, allow_redirects=True)
             if response.status_code != 200:
                 return None
                 
@@ -385,12 +447,9 @@ def fetch_duckduckgo_festivals(location, interests, month):
                 return date_str
         return ''
 
-    def search_comprehensive_sources(location, month):
-        """Search multiple comprehensive event sources with enhanced extraction"""
-        all_events = []
-        
-        # Define comprehensive event sources with better targeting
-        event_sources = [
+    def comprehensive_event_sources(location, month):
+        """Comprehensive event sources with better targeting"""
+        return [
             {
                 'name': 'AllEvents.in',
                 'urls': [
@@ -458,239 +517,225 @@ def fetch_duckduckgo_festivals(location, interests, month):
                 'result_selectors': ['.event-card', '.event-item', '[class*="event"]']
             }
         ]
-        
-        for source in event_sources:
-            try:
-                print(f"Scraping {source['name']} for detailed event information...")
-                
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Referer': 'https://www.google.com/',
-                }
-                
-                for url in source['urls']:
-                    try:
-                        response = requests.get(url, headers=headers, timeout=20)
-                        if response.status_code != 200:
-                            continue
-                            
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Try different result selectors
-                        events_found_this_url = 0
-                        for selector in source['result_selectors']:
-                            if events_found_this_url >= 8:  # Limit per URL
-                                break
-                                
-                            event_elements = soup.select(selector)
-                            
-                            for element in event_elements:
-                                if events_found_this_url >= 8:
-                                    break
-                                    
-                                # Extract basic event info with enhanced logic
-                                title_elem = element.select_one('h1, h2, h3, h4, h5, h6, .title, [class*="title"], [class*="name"], a[class*="event"], a[class*="link"]')
-                                link_elem = element.select_one('a[href], .link[href]') or element.find_parent('a')
-                                
-                                # Also try to find links within the element
-                                if not link_elem:
-                                    all_links = element.find_all('a', href=True)
-                                    for link in all_links:
-                                        href = link.get('href', '')
-                                        if href and ('event' in href or 'ticket' in href or len(href) > 10):
-                                            link_elem = link
-                                            break
-                                
-                                if title_elem and link_elem:
-                                    title = title_elem.get_text(strip=True)
-                                    event_url = link_elem.get('href', '')
-                                    
-                                    # Clean and validate URL
-                                    if event_url.startswith('/'):
-                                        from urllib.parse import urljoin
-                                        event_url = urljoin(url, event_url)
-                                    elif not event_url.startswith('http'):
-                                        continue
-                                    
-                                    # Enhanced title validation
-                                    if (title and event_url and len(title) > 3 and
-                                        not any(skip in title.lower() for skip in ['login', 'signup', 'search', 'menu', 'home', 'contact', 'about']) and
-                                        (any(keyword in title.lower() for keyword in ['festival', 'event', 'concert', 'show', 'exhibition', 'celebration', 'meet', 'workshop', 'conference']) or
-                                         any(month_part in title.lower() for month_part in [month.lower(), month.lower()[:3]])) and
-                                        event_url not in seen_urls):
-                                        
-                                        seen_urls.add(event_url)
-                                        
-                                        # Extract additional context from the card/element
-                                        card_text = element.get_text(strip=True)
-                                        
-                                        # Look for date information in the card
-                                        date_in_card = ""
-                                        date_elem = element.select_one('.date, .time, [class*="date"], [class*="time"]')
-                                        if date_elem:
-                                            date_in_card = date_elem.get_text(strip=True)
-                                        
-                                        # Look for location in the card
-                                        location_in_card = location
-                                        location_elem = element.select_one('.location, .venue, [class*="location"], [class*="venue"]')
-                                        if location_elem:
-                                            location_in_card = location_elem.get_text(strip=True)
-                                        
-                                        # Extract detailed information from event page
-                                        detailed_info = extract_detailed_event_info(event_url, location, month)
-                                        
-                                        if detailed_info and detailed_info.get('title'):
-                                            # Use detailed info if extraction was successful
-                                            event_data = {
-                                                'title': detailed_info['title'],
-                                                'url': event_url,
-                                                'content': detailed_info['content'],
-                                                'location': detailed_info['location'],
-                                                'date_info': detailed_info.get('date_info', date_in_card),
-                                                'source': source['name']
-                                            }
-                                            
-                                            if detailed_info.get('price_info'):
-                                                event_data['price_info'] = detailed_info['price_info']
-                                            
-                                            all_events.append(event_data)
-                                            events_found_this_url += 1
-                                            print(f"✓ Detailed extraction: {detailed_info['title'][:50]}...")
-                                            
-                                        else:
-                                            # Fallback to basic info with enhanced content
-                                            basic_content = card_text[:400]
-                                            if date_in_card:
-                                                basic_content += f" | Date: {date_in_card}"
-                                            
-                                            all_events.append({
-                                                'title': title,
-                                                'url': event_url,
-                                                'content': basic_content,
-                                                'location': location_in_card,
-                                                'date_info': date_in_card,
-                                                'source': source['name']
-                                            })
-                                            events_found_this_url += 1
-                                            print(f"✓ Basic extraction: {title[:50]}...")
-                                        
-                                        if len(all_events) >= 25:  # Limit total events
-                                            break
-                                
-                                if len(all_events) >= 25:
-                                    break
-                            
-                            if len(all_events) >= 25:
-                                break
-                        
-                        if len(all_events) >= 25:
+
+    def scrape_listing_page(source, url, location, month):
+        """Fetch one listing page and return the candidate event cards found on it"""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Referer': 'https://www.google.com/',
+        }
+
+        response = polite_get(url, headers=headers, timeout=20)
+        if response.status_code != 200:
+            return []
+
+        soup = BeautifulSoup(response.content, 'html.parser')
+        candidates = []
+        page_urls = set()
+
+        # Try different result selectors
+        for selector in source['result_selectors']:
+            for element in soup.select(selector):
+                # Extract basic event info with enhanced logic
+                title_elem = element.select_one('h1, h2, h3, h4, h5, h6, .title, [class*="title"], [class*="name"], a[class*="event"], a[class*="link"]')
+                link_elem = element.select_one('a[href], .link[href]') or element.find_parent('a')
+
+                # Also try to find links within the element
+                if not link_elem:
+                    all_links = element.find_all('a', href=True)
+                    for link in all_links:
+                        href = link.get('href', '')
+                        if href and ('event' in href or 'ticket' in href or len(href) > 10):
+                            link_elem = link
                             break
-                            
-                    except Exception as e:
-                        print(f"Error processing URL {url}: {e}")
-                        continue
-                
-                time.sleep(2)  # Rate limiting between sources
-                
-            except Exception as e:
-                print(f"Error scraping {source['name']}: {e}")
-                continue
-        
-        return all_events
 
-    def search_with_google_api_simulation(location, month):
-        """Enhanced Google search simulation for comprehensive results"""
-        events = []
-        
-        search_queries = [
-            f"{location} {month} 2025 festivals events",
-            f"{location} cultural festivals {month} 2025",
-            f"{location} music festivals {month} 2025",
-            f"{location} art exhibitions {month} 2025",
-            f"events in {location} {month} 2025"
-        ]
-        
-        for query in search_queries:
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                }
-                
-                search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}&num=20"
-                response = requests.get(search_url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    search_results = soup.select('.g')
-                    
-                    for result in search_results[:8]:
-                        title_elem = result.select_one('h3')
-                        link_elem = result.select_one('a[href]')
-                        snippet_elem = result.select_one('.st, .aCOpRe, [class*="snippet"]')
-                        
-                        if title_elem and link_elem:
-                            title = title_elem.get_text(strip=True)
-                            url = link_elem.get('href', '')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            # Clean Google redirect URLs
-                            if url.startswith('/url?q='):
-                                url = url.split('/url?q=')[1].split('&')[0]
-                            
-                            if (title and url.startswith('http') and 
-                                any(keyword in title.lower() for keyword in ['festival', 'event', 'concert', 'exhibition']) and
-                                url not in seen_urls):
-                                
-                                seen_urls.add(url)
-                                
-                                # Try to extract detailed info from this page too
-                                detailed_info = extract_detailed_event_info(url, location, month)
-                                
-                                if detailed_info:
-                                    events.append({
-                                        'title': detailed_info['title'],
-                                        'url': url,
-                                        'content': detailed_info['content'],
-                                        'location': detailed_info['location'],
-                                        'date_info': detailed_info.get('date_info', ''),
-                                        'source': 'Google Search'
-                                    })
-                                else:
-                                    events.append({
-                                        'title': title,
-                                        'url': url,
-                                        'content': snippet,
-                                        'location': location,
-                                        'date_info': '',
-                                        'source': 'Google Search'
-                                    })
-                
-                time.sleep(3)  # Rate limiting
-                
-            except Exception as e:
-                print(f"Google search failed for query '{query}': {e}")
-                continue
-        
-        return events
+                if not (title_elem and link_elem):
+                    continue
+
+                title = title_elem.get_text(strip=True)
+                event_url = link_elem.get('href', '')
+
+                # Clean and validate URL
+                if event_url.startswith('/'):
+                    event_url = urljoin(url, event_url)
+                elif not event_url.startswith('http'):
+                    continue
+
+                # Enhanced title validation
+                if (title and event_url and len(title) > 3 and
+                    not any(skip in title.lower() for skip in ['login', 'signup', 'search', 'menu', 'home', 'contact', 'about']) and
+                    (any(keyword in title.lower() for keyword in ['festival', 'event', 'concert', 'show', 'exhibition', 'celebration', 'meet', 'workshop', 'conference']) or
+                     any(month_part in title.lower() for month_part in [month.lower(), month.lower()[:3]])) and
+                    event_url not in page_urls):
+
+                    page_urls.add(event_url)
+
+                    # Extract additional context from the card/element
+                    card_text = element.get_text(strip=True)
+
+                    # Look for date information in the card
+                    date_in_card = ""
+                    date_elem = element.select_one('.date, .time, [class*="date"], [class*="time"]')
+                    if date_elem:
+                        date_in_card = date_elem.get_text(strip=True)
+
+                    # Look for location in the card
+                    location_in_card = location
+                    location_elem = element.select_one('.location, .venue, [class*="location"], [class*="venue"]')
+                    if location_elem:
+                        location_in_card = location_elem.get_text(strip=True)
+
+                    # Basic info with enhanced content, used if the detail page can't be parsed
+                    basic_content = card_text[:400]
+                    if date_in_card:
+                        basic_content += f" | Date: {date_in_card}"
+
+                    candidates.append({
+                        'title': title,
+                        'url': event_url,
+                        'content': basic_content,
+                        'location': location_in_card,
+                        'date_info': date_in_card,
+                        'source': source['name']
+                    })
+
+        return candidates
+
+    def scrape_google_results_page(search_url, location):
+        """Enhanced Google search simulation: return candidate events from one results page"""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        }
+
+        response = polite_get(search_url, headers=headers, timeout=10)
+        if response.status_code != 200:
+            return []
+
+        soup = BeautifulSoup(response.content, 'html.parser')
+        candidates = []
+
+        for result in soup.select('.g')[:8]:
+            title_elem = result.select_one('h3')
+            link_elem = result.select_one('a[href]')
+            snippet_elem = result.select_one('.st, .aCOpRe, [class*="snippet"]')
+
+            if title_elem and link_elem:
+                title = title_elem.get_text(strip=True)
+                url = link_elem.get('href', '')
+                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
+
+                # Clean Google redirect URLs
+                if url.startswith('/url?q='):
+                    url = url.split('/url?q=')[1].split('&')[0]
+
+                if (title and url.startswith('http') and
+                    any(keyword in title.lower() for keyword in ['festival', 'event', 'concert', 'exhibition'])):
+                    candidates.append({
+                        'title': title,
+                        'url': url,
+                        'content': snippet,
+                        'location': location,
+                        'date_info': '',
+                        'source': 'Google Search'
+                    })
+
+        return candidates
+
+    def build_event_from_candidate(candidate, location, month):
+        """Enrich a candidate with its detail page, falling back to the listing card data"""
+        detailed_info = extract_detailed_event_info(candidate['url'], location, month)
+
+        if detailed_info and detailed_info.get('title'):
+            event_data = {
+                'title': detailed_info['title'],
+                'url': candidate['url'],
+                'content': detailed_info['content'],
+                'location': detailed_info['location'],
+                'date_info': detailed_info.get('date_info', candidate['date_info']),
+                'source': candidate['source']
+            }
+
+            if detailed_info.get('price_info'):
+                event_data['price_info'] = detailed_info['price_info']
+
+            print(f"✓ Detailed extraction: {detailed_info['title'][:50]}...")
+            return event_data
+
+        print(f"✓ Basic extraction: {candidate['title'][:50]}...")
+        return dict(candidate)
 
     # Main execution
     print(f"Starting comprehensive event data collection for {location} in {month}...")
-    
-    # Phase 1: Comprehensive source scraping
-    comprehensive_events = search_comprehensive_sources(location, month)
-    
-    # Phase 2: Google search for additional events
-    google_events = search_with_google_api_simulation(location, month)
-    
-    # Combine all events
-    all_events = comprehensive_events + google_events
-    
+
+    # Phase 1: fan out every listing page (event sources + Google searches) at once
+    event_sources = comprehensive_event_sources(location, month)
+    search_queries = [
+        f"{location} {month} 2025 festivals events",
+        f"{location} cultural festivals {month} 2025",
+        f"{location} music festivals {month} 2025",
+        f"{location} art exhibitions {month} 2025",
+        f"events in {location} {month} 2025"
+    ]
+
+    listing_jobs = [
+        ((source['name'], url), lambda source=source, url=url: scrape_listing_page(source, url, location, month))
+        for source in event_sources
+        for url in source['urls']
+    ]
+    listing_jobs += [
+        (('Google Search', search_url), lambda search_url=search_url: scrape_google_results_page(search_url, location))
+        for search_url in (f"https://www.google.com/search?q={query.replace(' ', '+')}&num=20" for query in search_queries)
+    ]
+    listing_outcomes = run_concurrently(listing_jobs)
+
+    # Merge candidates in source order so results stay deterministic
+    comprehensive_candidates = []
+    google_candidates = []
+    for outcome in listing_outcomes:
+        source_name, url = outcome['key']
+        if outcome['error']:
+            print(f"Error processing URL {url}: {outcome['error']}")
+            continue
+
+        taken_this_url = 0
+        for candidate in outcome['result']:
+            if candidate['url'] in seen_urls:
+                continue
+            if source_name == 'Google Search':
+                seen_urls.add(candidate['url'])
+                google_candidates.append(candidate)
+                continue
+            if taken_this_url >= 8 or len(comprehensive_candidates) >= 25:  # Limit per URL / total events
+                break
+            seen_urls.add(candidate['url'])
+            comprehensive_candidates.append(candidate)
+            taken_this_url += 1
+
+    # Phase 2: fetch every selected event page at once
+    candidates = comprehensive_candidates + google_candidates
+    detail_outcomes = run_concurrently([
+        ((candidate['source'], candidate['url']), lambda candidate=candidate: build_event_from_candidate(candidate, location, month))
+        for candidate in candidates
+    ])
+    all_events = [outcome['result'] for outcome in detail_outcomes if outcome['result']]
+
+    listing_timings = summarize_timings(listing_outcomes, group_of=lambda key: key[0])
+    detail_timings = summarize_timings(detail_outcomes, group_of=lambda key: key[0])
+    source_timings.record({"listing": listing_timings, "detail": detail_timings})
+    for source_name, stats in listing_timings.items():
+        detail = detail_timings.get(source_name, {"jobs": 0, "elapsed": 0.0, "throttled": 0.0})
+        logger.info(
+            "%s: %d listing pages in %ss (%d failed), %d event pages in %ss, %ss throttled",
+            source_name, stats['jobs'], stats['elapsed'], stats['errors'], detail['jobs'], detail['elapsed'],
+            round(stats['throttled'] + detail['throttled'], 3),
+        )
+
     # Process events with AI for better quality and consistency
     print(f"Processing {len(all_events)} events with Gemini AI...")
     ai_processed_events = batch_process_events_with_ai(all_events, location, month, interests)
-    
+
     # Use AI-processed events as final results
     results = ai_processed_events[:12]  # Limit to 12 best events
 
@@ -698,7 +743,7 @@ def fetch_duckduckgo_festivals(location, interests, month):
     if len(results) < 3:
         print(f"Insufficient AI-processed data found ({len(results)} events). Generating enhanced fallback data...")
         fallback_events = generate_enhanced_fallback_data(location, month, interests, len(results))
-        
+
         # Process fallback events with AI too for consistency
         ai_processed_fallback = batch_process_events_with_ai(fallback_events, location, month, interests)
         results.extend(ai_processed_fallback)
@@ -829,6 +874,65 @@ def generate_enhanced_fallback_data(location, month, interests, existing_count):
     print(f"Generated {len(fallback_events)} enhanced fallback events")
     return fallback_events
 
+def build_recommendations(location, interests, month, cache_key):
+    """
+    Cold path of get_recommendations: scrape + AI-process, store, and cache the festivals.
+    Runs once per cache key at a time (see RECOMMENDATION_FLIGHTS).
+    """
+    festivals = fetch_duckduckgo_festivals(location, interests, month)
+
+    if not festivals or len(festivals) == 0:
+        print(f"No festivals found for {location} in {month}. This should not happen with enhanced fallback.")
+        return []
+
+    store_festivals(festivals)
+
+    # Cache the results with their _ids, so cache hits don't need to write anything
+    SEARCH_CACHE.set(cache_key, [dict(fest) for fest in festivals])
+
+    return festivals
+
+def store_festivals(festivals):
+    """Normalize and upsert festivals by fingerprint, and set their "_id" strings in place"""
+    for fest in festivals:
+        # Fingerprint the scraped fields: normalizing rewrites month
+        if not fest.get("fingerprint"):
+            fest["fingerprint"] = festival_fingerprint(fest)
+        normalize_festival(fest)
+
+    try:
+        for fest, festival_id in zip(festivals, festival_store.upsert_many(festivals)):
+            if festival_id is not None:
+                fest["_id"] = festival_id
+    except PyMongoError as e:
+        print(f"MongoDB error: {str(e)}")
+
+def refresh_recommendations_in_background(location, interests, month, cache_key):
+    """
+    Rebuild a stale cache entry off the request path. At most one rebuild per key
+    runs at a time: the refresh goes through RECOMMENDATION_FLIGHTS, so a cold
+    request for the same key joins it instead of starting another scrape.
+    """
+    with STALE_REFRESH_LOCK:
+        if cache_key in STALE_REFRESHING or RECOMMENDATION_FLIGHTS.is_running(cache_key):
+            return
+        STALE_REFRESHING.add(cache_key)
+        STALE_REFRESH_METRICS["refreshes_started"] += 1
+
+    def refresh():
+        try:
+            RECOMMENDATION_FLIGHTS.do(cache_key, lambda: build_recommendations(location, interests, month, cache_key))
+            print(f"Background refresh finished for {cache_key}")
+        except Exception as e:
+            with STALE_REFRESH_LOCK:
+                STALE_REFRESH_METRICS["refreshes_failed"] += 1
+            print(f"Background refresh failed for {cache_key}: {e}")
+        finally:
+            with STALE_REFRESH_LOCK:
+                STALE_REFRESHING.discard(cache_key)
+
+    threading.Thread(target=refresh, name=f"festifly-refresh-{cache_key[:8]}", daemon=True).start()
+
 @csrf_exempt
 def get_recommendations(request):
     if request.method != "POST":
@@ -851,56 +955,55 @@ def get_recommendations(request):
 
         print(f"[{datetime.utcnow()}] Searching: location={location}, month={month}, interests={interests}")
 
-        # Clean expired cache entries
-        clean_cache()
-
         # Check cache first
-        cache_key = f"{location.lower()}_{month.lower()}_{hash(tuple(sorted(interests)))}"
-        current_time = datetime.utcnow()
-        
-        if cache_key in SEARCH_CACHE:
-            cached_data = SEARCH_CACHE[cache_key]
-            cache_time = cached_data['timestamp']
-            time_diff = (current_time - cache_time).total_seconds() / 60
-            
-            if time_diff < CACHE_EXPIRY_MINUTES:
+        cache_key = recommendation_cache_key(location, month, interests)
+        cache_entry = SEARCH_CACHE.get_entry(cache_key)
+
+        if cache_entry is not None:
+            cached_festivals, age_seconds = cache_entry
+            stale = age_seconds >= CACHE_EXPIRY_MINUTES * 60
+            if stale:
+                # Stale but within CACHE_MAX_STALE_MINUTES: answer now, refresh for the next caller
+                print(f"Serving stale results for {cache_key} ({age_seconds / 60:.0f} min old), refreshing")
+                with STALE_REFRESH_LOCK:
+                    STALE_REFRESH_METRICS["stale_served"] += 1
+                refresh_recommendations_in_background(location, interests, month, cache_key)
+            else:
                 print(f"Using cached results for {cache_key}")
-                cached_festivals = cached_data['festivals']
-                
-                # Add new _id for each cached result since they're being inserted fresh
-                try:
-                    insert_result = festival_collection.insert_many(copy.deepcopy(cached_festivals))
-                    for i, fest in enumerate(cached_festivals):
-                        fest["_id"] = str(insert_result.inserted_ids[i])
-                except PyMongoError as e:
-                    print(f"MongoDB error: {str(e)}")
-                
-                return JsonResponse({"festivals": cached_festivals}, status=200)
+            # Cached dicts are shared between requests, so only touch shallow copies
+            cached_festivals = [dict(fest) for fest in cached_festivals]
+
+            # Cached festivals already carry their stored _id; only entries cached before
+            # festivals were fingerprinted need storing. Write the _ids back so this happens
+            # once per entry; a stale entry is left to the refresh, which rewrites it anyway.
+            if any("_id" not in fest for fest in cached_festivals):
+                store_festivals(cached_festivals)
+                if not stale and all("_id" in fest for fest in cached_festivals):
+                    SEARCH_CACHE.set(cache_key, [dict(fest) for fest in cached_festivals])
+
+            return JsonResponse({"festivals": cached_festivals}, status=200)
+
+        # Identical queries already being scraped in this worker wait for that result
+        try:
+            festivals, shared = RECOMMENDATION_FLIGHTS.do(
+                cache_key,
+                lambda: build_recommendations(location, interests, month, cache_key),
+                timeout=SINGLEFLIGHT_TIMEOUT_SECONDS,
+            )
+        except SingleFlightTimeout as e:
+            return JsonResponse({"error": f"{str(e)}. Please try again shortly."}, status=503)
 
-        festivals = fetch_duckduckgo_festivals(location, interests, month)
+        if shared:
+            print(f"Coalesced with in-flight search for {cache_key}")
 
-        if not festivals or len(festivals) == 0:
-            print(f"No festivals found for {location} in {month}. This should not happen with enhanced fallback.")
+        if not festivals:
             return JsonResponse({
                 "message": "No festivals found for the given filters.",
                 "festivals": []
             }, status=200)
 
-        # Cache the results - the AI-processed results from fetch_duckduckgo_festivals
-        SEARCH_CACHE[cache_key] = {
-            'festivals': copy.deepcopy(festivals),
-            'timestamp': current_time
-        }
-
-        try:
-            insert_result = festival_collection.insert_many(copy.deepcopy(festivals))
-            for i, fest in enumerate(festivals):
-                fest["_id"] = str(insert_result.inserted_ids[i])
-        except PyMongoError as e:
-            print(f"MongoDB error: {str(e)}")
-
-        # Sort by title alphabetically
-        festivals.sort(key=lambda x: x.get("title", "").lower())
+        # Sort by title alphabetically (into a new list: the result may be shared with coalesced requests)
+        festivals = sorted(festivals, key=lambda x: x.get("title", "").lower())
 
         return JsonResponse({"festivals": festivals}, status=200)
 
@@ -917,7 +1020,16 @@ def get_festival_by_id(request):
         if not festival_id:
             return JsonResponse({"error": "_id is required"}, status=400)
 
-        festival = festival_collection.find_one({"_id": ObjectId(festival_id)})
+        # Optional sparse fieldset, in the body or the query string; the whole document otherwise
+        try:
+            fields = parse_fields(body.get("fields", request.GET.get("fields")))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        festival = festival_collection.find_one(
+            {"_id": ObjectId(festival_id)},
+            projection(*fields) if fields else None,
+        )
         if not festival:
             return JsonResponse({"error": "Festival not found"}, status=404)
 
@@ -938,7 +1050,10 @@ def fetch_reddit_reviews_by_id(request):
             return JsonResponse({"error": "_id is required"}, status=400)
 
         # Fetch festival from DB
-        festival = festival_collection.find_one({"_id": ObjectId(festival_id)})
+        festival = festival_collection.find_one(
+            {"_id": ObjectId(festival_id)},
+            projection("title", "location", "month", "reddit_review"),
+        )
         if not festival:
             return JsonResponse({"error": "Festival not found in database."}, status=404)
 
@@ -969,7 +1084,7 @@ def fetch_reddit_reviews_by_id(request):
                 "t": "year"
             }
 
-            res = requests.get(url, headers=HEADERS, params=params)
+            res = http_client.get("reddit", url, headers=HEADERS, params=params)
             if res.status_code != 200:
                 continue
 
@@ -1138,60 +1253,285 @@ Only return valid JSON. No extra explanation or text.
 
     return JsonResponse({"error": "Only POST method allowed"}, status=405)
 
+# Fields returned by the festival listing; everything else (AI voice/video data, raw comments) stays in MongoDB
+FESTIVAL_LIST_FIELDS = ["title", "location", "tags", "content", "reddit_url", "upvotes", "month", "vibe_score", "fetched_at"]
+FESTIVAL_PAGE_SIZE = 100
+FESTIVAL_MAX_PAGE_SIZE = 500
+
+def festival_list_item(fest, fields=FESTIVAL_LIST_FIELDS):
+    item = {"_id": str(fest["_id"])}
+    for field in fields:
+        item[field] = fest.get(field)
+    return item
+
 @csrf_exempt
 def get_all_festivals(request):
+    """
+    Festivals, newest first, one page at a time (keyset pagination on _id).
+
+    Query params: limit (default 100, max 500), after (next_cursor of the previous
+    page), fields (comma-separated, defaults to FESTIVAL_LIST_FIELDS). format=ndjson
+    streams one festival per line instead, from `after` to the end of the collection
+    unless a limit is given.
+    """
     if request.method != "GET":
         return JsonResponse({"error": "Only GET method is allowed."}, status=405)
 
     try:
-        festivals_cursor = festival_collection.find()
-        festivals = []
-        for fest in festivals_cursor:
-            fest_copy = copy.deepcopy(fest)
-            fest_copy["_id"] = str(fest_copy.get("_id", ""))
-            festivals.append({
-                "_id": fest_copy.get("_id"),
-                "title": fest_copy.get("title"),
-                "location": fest_copy.get("location"),
-                "tags": fest_copy.get("tags"),
-                "content": fest_copy.get("content"),
-                "reddit_url": fest_copy.get("reddit_url"),
-                "upvotes": fest_copy.get("upvotes"),
-                "month": fest_copy.get("month"),
-                "vibe_score": fest_copy.get("vibe_score"),
-                "fetched_at": fest_copy.get("fetched_at")
-            })
+        streaming = request.GET.get("format") == "ndjson"
+        try:
+            limit = request.GET.get("limit")
+            limit = int(limit) if limit else (0 if streaming else FESTIVAL_PAGE_SIZE)
+            if limit < 0:
+                raise ValueError
+            if not streaming:
+                limit = min(limit or FESTIVAL_PAGE_SIZE, FESTIVAL_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"error": "limit must be a non-negative integer."}, status=400)
 
-        return JsonResponse({"festivals": festivals}, status=200)
+        try:
+            fields = parse_fields(request.GET.get("fields")) or FESTIVAL_LIST_FIELDS
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        query = {}
+        after = request.GET.get("after")
+        if after:
+            if not ObjectId.is_valid(after):
+                return JsonResponse({"error": "Invalid cursor."}, status=400)
+            query["_id"] = {"$lt": ObjectId(after)}
+
+        cursor = festival_collection.find(query, projection(*fields)).sort("_id", -1).limit(limit)
+
+        if streaming:
+            def ndjson_lines():
+                with cursor.batch_size(FESTIVAL_PAGE_SIZE) as rows:
+                    for fest in rows:
+                        yield json.dumps(festival_list_item(fest, fields), cls=DjangoJSONEncoder) + "\n"
+
+            return StreamingHttpResponse(ndjson_lines(), content_type="application/x-ndjson")
+
+        festivals = [festival_list_item(fest, fields) for fest in cursor]
+        next_cursor = festivals[-1]["_id"] if len(festivals) == limit else None
+
+        return JsonResponse({"festivals": festivals, "next_cursor": next_cursor}, status=200)
 
     except PyMongoError as e:
         return JsonResponse({"error": f"MongoDB error: {str(e)}"}, status=500)
     except Exception as e:
         return JsonResponse({"error": f"Server error: {str(e)}"}, status=500)
     
+def media_url(media_id):
+    return f"/api/media/{media_id}/"
+
+def move_voice_blob_to_media_store(festival_id, language, audio_base64):
+    """Move a voice briefing stored as base64 on the festival document into the media store"""
+    audio_id = media_store.put(base64.b64decode(audio_base64), "audio/mpeg")
+    festival_collection.update_one(
+        {"_id": ObjectId(festival_id)},
+        {
+            "$set": {f"ai_voice_data.{language}.audio_id": audio_id},
+            "$unset": {f"ai_voice_data.{language}.blob": "", f"ai_voice_data.{language}.url": ""},
+        }
+    )
+    return audio_id
+
+@csrf_exempt
+def stream_media(request, media_id):
+    """Stored media (voice briefings), with ETag revalidation and single-range Range requests"""
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"error": "Only GET method is allowed."}, status=405)
+
+    try:
+        media = media_store.open(media_id)
+    except PyMongoError as e:
+        return JsonResponse({"error": f"MongoDB error: {str(e)}"}, status=500)
+    if media is None:
+        return JsonResponse({"error": "Media not found"}, status=404)
+
+    # Content-addressed: the id is a strong validator and the bytes never change
+    etag = f'"{media_id}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "public, max-age=31536000, immutable"}
+    length = media.length
+
+    if_none_match = [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]
+    if etag in if_none_match or "*" in if_none_match:
+        media.close()
+        return HttpResponse(status=304, headers=headers)
+
+    byte_range = None
+    if request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(request.headers.get("Range"), length)
+    if byte_range is False:
+        media.close()
+        return HttpResponse(status=416, headers={**headers, "Content-Range": f"bytes */{length}"})
+
+    if byte_range is None:
+        start, end, status = 0, length - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    content_type = (media.metadata or {}).get("content_type", "application/octet-stream")
+
+    if request.method == "HEAD":
+        media.close()
+        return HttpResponse(status=status, content_type=content_type, headers=headers)
+    return StreamingHttpResponse(iter_chunks(media, start, end), status=status, content_type=content_type, headers=headers)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+NEAR_DEFAULT_RADIUS_KM = 50
+NEAR_MAX_RADIUS_KM = 1000
+geo_index_ready = False
+
+def ensure_festival_geo_index():
+    global geo_index_ready
+    if not geo_index_ready:
+        festival_collection.create_indexes([FESTIVAL_GEO_INDEX])
+        geo_index_ready = True
+
+def parse_coordinate(value, limit):
+    number = float(value)
+    if not math.isfinite(number) or abs(number) > limit:
+        raise ValueError(f"{value} is out of range")
+    return number
+
+@csrf_exempt
+def festivals_near(request):
+    """
+    Geocoded festivals, from the 2dsphere index on `geo`.
+
+    Around a point, nearest first: lat & lng, or near=<city name from the gazetteer>,
+    within radius_km (default 50, max 1000). Or inside bbox=min_lng,min_lat,max_lng,max_lat.
+    Also: limit (default 20, max 100), fields.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET method is allowed."}, status=405)
+
+    try:
+        limit = min(max(1, int(request.GET.get("limit", SEARCH_PAGE_SIZE))), SEARCH_MAX_PAGE_SIZE)
+        fields = parse_fields(request.GET.get("fields")) or FESTIVAL_LIST_FIELDS
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid parameter: {str(e)}"}, status=400)
+
+    try:
+        ensure_festival_geo_index()
+
+        if request.GET.get("bbox"):
+            try:
+                min_lng, min_lat, max_lng, max_lat = [
+                    parse_coordinate(value, bound)
+                    for value, bound in zip(request.GET["bbox"].split(","), (180, 90, 180, 90))
+                ]
+                if min_lng >= max_lng or min_lat >= max_lat:
+                    raise ValueError("min must be below max")
+            except ValueError as e:
+                return JsonResponse({"error": f"bbox must be min_lng,min_lat,max_lng,max_lat: {str(e)}"}, status=400)
+
+            query = {"geo": {"$geoWithin": {"$geometry": bbox_polygon(min_lng, min_lat, max_lng, max_lat)}}}
+            festivals = [
+                festival_list_item(fest, fields)
+                for fest in festival_collection.find(query, projection(*fields)).limit(limit)
+            ]
+            return JsonResponse({"festivals": festivals}, status=200)
+
+        if request.GET.get("near"):
+            city = find_city(request.GET["near"])
+            if city is None:
+                return JsonResponse({"error": "Unknown place; pass lat and lng instead."}, status=400)
+            lat, lng = city["lat"], city["lng"]
+        else:
+            try:
+                lat = parse_coordinate(request.GET.get("lat", ""), 90)
+                lng = parse_coordinate(request.GET.get("lng", ""), 180)
+            except ValueError:
+                return JsonResponse({"error": "Pass lat and lng, near, or bbox."}, status=400)
+
+        try:
+            radius_km = float(request.GET.get("radius_km", NEAR_DEFAULT_RADIUS_KM))
+            if not 0 < radius_km <= NEAR_MAX_RADIUS_KM:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({"error": f"radius_km must be between 0 and {NEAR_MAX_RADIUS_KM}."}, status=400)
+
+        pipeline = [
+            {"$geoNear": {
+                "near": geo_point(lng, lat),
+                "distanceField": "distance_km",
+                "maxDistance": radius_km * 1000,
+                "distanceMultiplier": 0.001,
+                "spherical": True,
+            }},
+            {"$limit": limit},
+            {"$project": {**projection(*fields), "distance_km": 1}},
+        ]
+        festivals = []
+        for fest in festival_collection.aggregate(pipeline):
+            item = festival_list_item(fest, fields)
+            item["distance_km"] = round(fest["distance_km"], 2)
+            festivals.append(item)
+
+        return JsonResponse({"center": {"lat": lat, "lng": lng}, "radius_km": radius_km, "festivals": festivals}, status=200)
+
+    except PyMongoError as e:
+        return JsonResponse({"error": f"MongoDB error: {str(e)}"}, status=500)
+
+@csrf_exempt
+def search_festivals(request):
+    """
+    Keyword search over the in-memory festival index (see api/search_index.py).
+
+    Query params: q, tags (comma-separated, all required), month, location,
+    limit (default 20, max 100), offset. Returns ranked results with tag/month facet counts.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET method is allowed."}, status=405)
+
+    try:
+        limit = min(max(1, int(request.GET.get("limit", SEARCH_PAGE_SIZE))), SEARCH_MAX_PAGE_SIZE)
+        offset = max(0, int(request.GET.get("offset", 0)))
+    except ValueError:
+        return JsonResponse({"error": "limit and offset must be integers."}, status=400)
+
+    tags = [tag for tag in request.GET.get("tags", "").split(",") if tag.strip()]
+    # Stored months are canonical ("December"); accept "Dec", "dec" or "12" too
+    month = None
+    if request.GET.get("month", "").strip():
+        month = normalize_month(request.GET["month"])
+        if month is None:
+            return JsonResponse({"error": "month must be a month name, abbreviation or number."}, status=400)
+
+    started = time.monotonic()
+    try:
+        result = festival_search.search(
+            text=request.GET.get("q", ""),
+            tags=tags,
+            month=month,
+            location=request.GET.get("location") or None,
+            limit=limit,
+            offset=offset,
+        )
+    except PyMongoError as e:
+        return JsonResponse({"error": f"MongoDB error: {str(e)}"}, status=500)
+
+    result["took_ms"] = round((time.monotonic() - started) * 1000, 2)
+    return JsonResponse(result, status=200)
+
 #===============================================================Voice Assistant===========================================================@csrf_exempt
 @csrf_exempt
 @api_view(["POST"])
 def generate_voice_briefing(request):
+    reservation = None
     try:
-        import base64
-        from bson.objectid import ObjectId
-        
-        # Verify user authentication and get user ID from token
-        auth_header = request.headers.get('Authorization', '')
-        user_id = None
-        plan = None
-        
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            try:
-                payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-                user_id = payload.get("user_id")
-                plan = payload.get("plan")  # Get user plan from token
-            except:
-                return JsonResponse({"error": "Invalid or expired token"}, status=401)
-        else:
-            return JsonResponse({"error": "Authorization token required"}, status=401)
+        # Authenticated user (resolved by JWTAuthenticationMiddleware)
+        principal, error = authenticate(request, require_account=True)
+        if error:
+            return error
+        user_id = principal.id
+        # Plan and usage from the user document: token claims may predate another worker's writes
+        snapshot = subscription_snapshot(principal, use_claims=False)
+        plan = active_plan_of(snapshot)
 
         data = json.loads(request.body)
         festival_id = data.get("_id")
@@ -1199,9 +1539,14 @@ def generate_voice_briefing(request):
 
         if not festival_id:
             return JsonResponse({"error": "_id is required"}, status=400)
+        if not is_valid_language(language):
+            return JsonResponse({"error": "Invalid language"}, status=400)
 
         # Fetch festival from DB
-        fest = festival_collection.find_one({"_id": ObjectId(festival_id)})
+        fest = festival_collection.find_one(
+            {"_id": ObjectId(festival_id)},
+            briefing_projection(f"ai_voice_data.{language}"),
+        )
         if not fest:
             return JsonResponse({"error": "Festival not found"}, status=404)
 
@@ -1211,42 +1556,21 @@ def generate_voice_briefing(request):
                 "error": "Free users can only generate English voice briefings. Please upgrade to access other languages."
             }, status=403)
 
-        # Get user's current voice usage count
-        user = None
-        if user_id:
-            user = db['users'].find_one({"_id": ObjectId(user_id)})
-            
-            if user:
-                # Check usage limits based on plan
-                voice_usage = user.get('voice_usage', 0)
-                
-                if plan == 'yearly':
-                    # Unlimited for yearly subscribers
-                    pass
-                elif plan == 'monthly' and voice_usage >= 5:
-                    return JsonResponse({
-                        "error": "You've reached your monthly limit of 5 voice generations. Please upgrade to our annual plan for unlimited access."
-                    }, status=403)
-                elif not plan and voice_usage >= 2:
-                    return JsonResponse({
-                        "error": "You've reached your free tier limit of 2 voice generations. Please upgrade to a premium plan."
-                    }, status=403)
+        # Take one voice briefing from the plan's quota (given back below if generation fails)
+        reservation = reserve(users_collection, ObjectId(user_id), "voice", plan)
+        if reservation is None:
+            return JsonResponse({"error": limit_message("voice", plan)}, status=403)
 
         # ✅ Return cached voice data if available
         voice_data = fest.get("ai_voice_data", {})
-        if language in voice_data and all(k in voice_data[language] for k in ["script", "blob"]):
-            # If authenticated and using cache, still increment usage for non-yearly users
-            if user_id and plan != 'yearly' and user:
-                db['users'].update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$inc": {"voice_usage": 1}}
-                )
-            
+        cached_voice = voice_data.get(language, {})
+        if "script" in cached_voice and ("audio_id" in cached_voice or "blob" in cached_voice):
+            audio_id = cached_voice.get("audio_id") or move_voice_blob_to_media_store(festival_id, language, cached_voice["blob"])
+
             # Return cached data
             return JsonResponse({
-                "script": voice_data[language]["script"],
-                "audio_url": voice_data[language].get("url"),
-                "audio_blob": voice_data[language]["blob"]
+                "script": cached_voice["script"],
+                "audio_url": media_url(audio_id),
             })
 
         # 🎙️ Language to Voice ID mapping
@@ -1290,7 +1614,7 @@ def generate_voice_briefing(request):
                 "dt": "t",
                 "q": script_en,
             }
-            res = requests.get(translate_url, params=params)
+            res = http_client.get("google_translate", translate_url, params=params)
             translated = res.json()[0]
             final_script = "".join([line[0] for line in translated])
 
@@ -1309,46 +1633,31 @@ def generate_voice_briefing(request):
             }
         }
 
-        res = requests.post(tts_url, headers=headers, json=payload)
+        res = http_client.post("elevenlabs", tts_url, headers=headers, json=payload)
         if res.status_code != 200:
+            reservation.release()
             return JsonResponse({"error": "Voice generation failed", "details": res.text}, status=500)
 
-        # 💾 Save local mp3 (optional)
-        filename = f"{festival_id}_{language}.mp3"
-        audio_path = f"static/voices/{filename}"
-        os.makedirs("static/voices", exist_ok=True)
-        with open(audio_path, "wb") as f:
-            f.write(res.content)
-
-        # 🔐 Convert to base64
-        audio_base64 = base64.b64encode(res.content).decode("utf-8")
-
-        # 📦 Save in structured format
+        # 💾 Store the mp3 in the media store; the festival only keeps its id
+        audio_id = media_store.put(res.content, "audio/mpeg")
         festival_collection.update_one(
             {"_id": ObjectId(festival_id)},
             {"$set": {
                 f"ai_voice_data.{language}": {
                     "script": final_script,
-                    "url": f"/static/voices/{filename}",
-                    "blob": audio_base64
+                    "audio_id": audio_id
                 }
             }}
         )
 
-        # Update user's voice usage count if not on yearly plan
-        if user_id and plan != 'yearly' and user:
-            db['users'].update_one(
-                {"_id": ObjectId(user_id)},
-                {"$inc": {"voice_usage": 1}}
-            )
-
         return JsonResponse({
             "script": final_script,
-            "audio_url": f"/static/voices/{filename}",
-            "audio_blob": audio_base64
+            "audio_url": media_url(audio_id)
         })
 
     except Exception as e:
+        if reservation is not None:
+            reservation.release()
         return JsonResponse({"error": str(e)}, status=500)
 
 #=============================================================== Video Model ===========================================================
@@ -1366,9 +1675,14 @@ def generate_ai_video(request):
 
         if not festival_id:
             return JsonResponse({"error": "_id is required"}, status=400)
+        if not is_valid_language(language):
+            return JsonResponse({"error": "Invalid language"}, status=400)
 
         # Fetch festival from DB
-        fest = festival_collection.find_one({"_id": ObjectId(festival_id)})
+        fest = festival_collection.find_one(
+            {"_id": ObjectId(festival_id)},
+            briefing_projection(f"ai_video_data.{language}", f"ai_voice_data.{language}.script"),
+        )
         if not fest:
             return JsonResponse({"error": "Festival not found"}, status=404)
 
@@ -1420,7 +1734,7 @@ def generate_ai_video(request):
         }
 
         try:
-            res = requests.post(tavus_url, headers=headers, json=payload, timeout=70)
+            res = http_client.post("tavus", tavus_url, headers=headers, json=payload, timeout=(5, 70))
             if res.status_code == 200:
                 tavus_data = res.json()
                 video_url = tavus_data.get("video_url") or tavus_data.get("url") or "PENDING"
@@ -1494,6 +1808,7 @@ def process_with_gemini_ai(raw_event_data, location, month, interests):
         If the event seems irrelevant or low-quality, return: {{"skip": true}}
         """
 
+        rate_limiter.acquire("api:gemini")
         response = model.generate_content(prompt)
         result_text = response.text.strip()
         
@@ -1526,37 +1841,217 @@ def process_with_gemini_ai(raw_event_data, location, month, interests):
             return None
             
     except Exception as e:
+        # Quota errors must reach the worker pool so it can back off
+        if is_quota_error(e):
+            raise
         print(f"Error processing with Gemini AI: {e}")
         return None
 
+def process_events_batch_with_gemini(raw_events, location, month, interests):
+    """
+    Normalize several raw events with a single Gemini prompt.
+
+    Returns {input_index: processed_event or None}; None means the AI asked to skip
+    the event. Indexes missing from the result failed and may be re-submitted.
+    """
+    events_block = "\n".join(
+        json.dumps({
+            "index": i,
+            "title": event.get('title', ''),
+            "content": event.get('content', ''),
+            "location": event.get('location', location),
+            "date_info": event.get('date_info', ''),
+            "url": event.get('url', ''),
+            "source": event.get('source', 'web_scraping'),
+        }, ensure_ascii=False)
+        for i, event in enumerate(raw_events)
+    )
+
+    prompt = f"""
+    You are a data processing assistant for a festival/event discovery platform.
+    Process each of the following raw events (one JSON object per line) and return ONLY a valid JSON array.
+
+    Raw Events:
+    {events_block}
+
+    Context:
+    Target Location: {location}
+    Target Month: {month}
+    User Interests: {interests}
+
+    Requirements for every event:
+    1. Clean and improve the title (max 100 characters, remove HTML, fix formatting)
+    2. Create a compelling 2-3 sentence description that highlights what makes this event special
+    3. Extract or improve location information to be specific and accurate
+    4. Generate relevant tags based on the content and user interests (max 5 tags)
+    5. Ensure the URL is valid and properly formatted
+    6. Verify the event is actually relevant to the target location and month
+
+    Return ONLY a JSON array with exactly one object per input event, each carrying the input "index":
+    [
+      {{
+        "index": 0,
+        "title": "Clean, engaging event title",
+        "location": "Specific location (city, venue if available)",
+        "tags": ["tag1", "tag2", "tag3"],
+        "url": "valid_url_here",
+        "month": "{month}",
+        "content": "2-3 compelling sentences about what makes this event special and worth attending"
+      }}
+    ]
+
+    If an event seems irrelevant or low-quality, return {{"index": <its index>, "skip": true}} for it.
+    """
+
+    rate_limiter.acquire("api:gemini")
+    response = model.generate_content(prompt)
+    result_text = response.text.strip()
+
+    # Remove markdown code blocks if present
+    cleaned_text = re.sub(r'^```[a-zA-Z]*\n?', '', result_text)
+    cleaned_text = re.sub(r'\n?```$', '', cleaned_text)
+
+    try:
+        parsed_items = json.loads(cleaned_text)
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse AI batch response as JSON: {e}")
+        return {}
+
+    if not isinstance(parsed_items, list):
+        print(f"AI batch response is not a JSON array: {type(parsed_items).__name__}")
+        return {}
+
+    required_fields = ['title', 'location', 'tags', 'url', 'month', 'content']
+    results = {}
+    for item in parsed_items:
+        if not isinstance(item, dict):
+            continue
+        index = item.pop('index', None)
+        if not isinstance(index, int) or not 0 <= index < len(raw_events) or index in results:
+            continue
+
+        if item.get('skip'):
+            results[index] = None
+        elif all(field in item for field in required_fields):
+            item['fetched_at'] = datetime.utcnow()
+            results[index] = item
+        else:
+            print(f"AI response missing required fields for event {index}: {item}")
+
+    return results
+
 def batch_process_events_with_ai(events_list, location, month, interests):
     """
-    Process multiple events with AI in batches to avoid rate limits
+    Process multiple events with AI. Events normalized before (same raw data,
+    context and prompt version) come straight from the AI event cache; only the
+    rest go to Gemini. Pacing is left to the shared Gemini token bucket.
     """
+    keys = [event_cache_key(event, location, month, interests) for event in events_list]
+    cached = ai_event_cache.get_many(keys)
+    results = {i: cached[key] for i, key in enumerate(keys) if key in cached}
+    misses = [i for i in range(len(events_list)) if i not in results]
+    print(f"AI event cache: {len(results)} hits, {len(misses)} misses")
+
+    if misses:
+        miss_events = [events_list[i] for i in misses]
+        if GEMINI_BATCH_SIZE <= 1:
+            new_results = process_events_one_by_one_with_ai(miss_events, location, month, interests)
+        else:
+            new_results = process_events_in_batches_with_ai(miss_events, location, month, interests)
+
+        for position, result in new_results.items():
+            results[misses[position]] = result
+        ai_event_cache.put_many({keys[misses[position]]: result for position, result in new_results.items()})
+
     processed_events = []
-    
-    for i, event in enumerate(events_list):
-        try:
-            print(f"Processing event {i+1}/{len(events_list)} with AI: {event.get('title', 'Unknown')[:50]}...")
-            
-            processed_event = process_with_gemini_ai(event, location, month, interests)
-            
-            if processed_event:
-                processed_events.append(processed_event)
-                print(f"✓ AI processed: {processed_event['title'][:50]}...")
-            else:
-                print(f"✗ AI skipped or failed processing")
-            
-            # Rate limiting - wait between API calls
-            time.sleep(1)
-            
-        except Exception as e:
-            print(f"Error processing event {i+1}: {e}")
-            continue
-    
-    print(f"AI processing complete: {len(processed_events)} events processed from {len(events_list)} raw events")
+    for i in range(len(events_list)):
+        processed_event = results.get(i)
+        if processed_event:
+            processed_event['fetched_at'] = datetime.utcnow()
+            # The AI output has no dates; keep the raw text for normalize_festival
+            if events_list[i].get('date_info'):
+                processed_event.setdefault('date_info', events_list[i]['date_info'])
+            processed_events.append(processed_event)
+            print(f"✓ AI processed: {processed_event['title'][:50]}...")
+
+    print(f"AI processing complete: {len(processed_events)} events processed from {len(events_list)} raw events "
+          f"({len(events_list) - len(results)} failed, {sum(1 for r in results.values() if r is None)} skipped)")
+    print(f"[throttle] gemini: {rate_limiter.bucket('api:gemini').stats()}")
+    print(f"[pool] gemini: {gemini_pool.stats()}")
+    print(f"[cache] ai events: {ai_event_cache.stats()}")
     return processed_events
 
+def process_events_in_batches_with_ai(events_list, location, month, interests):
+    """
+    Normalize events GEMINI_BATCH_SIZE per prompt, running batches concurrently on
+    the adaptive Gemini pool. Events the model drops or mangles are re-submitted on
+    their own, up to GEMINI_BATCH_RETRIES times.
+
+    Returns {index: processed_event or None (skipped)}; failed indexes are left out.
+    """
+    results = {}
+    pending = list(range(len(events_list)))
+
+    for attempt in range(GEMINI_BATCH_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"Re-submitting {len(pending)} events that failed AI processing (retry {attempt})")
+
+        # A retry sends each event in its own prompt, so one event the model keeps
+        # mangling can't make it drop the rest of a batch again
+        batch_size = 1 if attempt else GEMINI_BATCH_SIZE
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        print(f"Processing {len(pending)}/{len(events_list)} events with AI in {len(batches)} batches...")
+        outcomes = gemini_pool.map(
+            lambda batch_indexes: process_events_batch_with_gemini(
+                [events_list[i] for i in batch_indexes], location, month, interests
+            ),
+            batches,
+        )
+
+        failed = []
+        for batch_indexes, outcome in zip(batches, outcomes):
+            batch_results = outcome["result"] or {}
+            if outcome["error"] is not None:
+                print(f"Error processing AI batch: {outcome['error']}")
+            print(f"AI batch {batch_indexes[0] + 1}-{batch_indexes[-1] + 1} took {outcome['latency']:.2f}s")
+
+            for position, event_index in enumerate(batch_indexes):
+                if position in batch_results:
+                    results[event_index] = batch_results[position]
+                else:
+                    failed.append(event_index)
+
+        pending = failed
+
+    return results
+
+def process_events_one_by_one_with_ai(events_list, location, month, interests):
+    """
+    Process multiple events with AI, one prompt per event, concurrently on the adaptive Gemini pool.
+
+    Returns {index: processed_event}; process_with_gemini_ai can't tell skips from
+    failures, so both are left out.
+    """
+    results = {}
+    outcomes = gemini_pool.map(
+        lambda event: process_with_gemini_ai(event, location, month, interests),
+        events_list,
+    )
+
+    for i, (event, outcome) in enumerate(zip(events_list, outcomes)):
+        print(f"AI event {i+1}/{len(events_list)} took {outcome['latency']:.2f}s: {event.get('title', 'Unknown')[:50]}...")
+
+        if outcome["result"]:
+            results[i] = outcome["result"]
+        elif outcome["error"] is not None:
+            print(f"Error processing event {i+1}: {outcome['error']}")
+        else:
+            print(f"✗ AI skipped or failed processing")
+
+    return results
+
 def enhance_existing_festival_data(festival_id):
     """
     Enhance an existing festival record with AI-generated improved content
@@ -1663,58 +2158,27 @@ def generate_tavus_video(request):
         return JsonResponse({"error": "_id is required"}, status=400)
 
     # Check authentication and subscription status
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return JsonResponse({"error": "Authentication required for video generation"}, status=401)
-    
-    token = auth_header.split(' ')[1]
+    principal, error = authenticate(request, require_account=True)
+    if error:
+        return error
+    user_id = principal.id
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        user_id = payload.get("user_id")
+        # Plan and usage from the user document: token claims may predate another worker's writes
+        snapshot = subscription_snapshot(principal, use_claims=False)
+        plan = active_plan_of(snapshot)
         
-        # Get user from database
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            return JsonResponse({"error": "User not found"}, status=404)
+        # Early answer for users already at their limit; the reservation below is what enforces it
+        if remaining("video", plan, snapshot["video_usage"]) == 0:
+            return JsonResponse({"error": limit_message("video", plan)}, status=403)
         
-        # Check subscription expiry
-        user = check_subscription_expiry(user)
-        
-        # Get current usage counts
-        voice_usage = user.get('voice_usage', 0)
-        video_usage = user.get('video_usage', 0)
-        
-        # Check premium status
-        premium = user.get('premium', {})
-        plan = premium.get('plan') if premium.get('is_active', False) else None
-        
-        # Check video generation limits
-        if plan == 'yearly':
-            # Yearly plan: 6 video generations + unlimited voice
-            if video_usage >= 6:
-                return JsonResponse({
-                    "error": "You have reached the video generation limit for your yearly plan (6 videos)."
-                }, status=403)
-        elif plan == 'monthly':
-            # Monthly plan: 2 video generations + 5 voice generations
-            if video_usage >= 2:
-                return JsonResponse({
-                    "error": "You have reached the video generation limit for your monthly plan (2 videos). Upgrade to yearly for more videos."
-                }, status=403)
-        else:
-            # Free plan: 1 video generation + 2 voice generations
-            if video_usage >= 1:
-                return JsonResponse({
-                    "error": "You have reached the video generation limit for free users (1 video). Please upgrade to generate more videos."
-                }, status=403)
-        
-    except jwt.ExpiredSignatureError:
-        return JsonResponse({"error": "Token expired"}, status=401)
-    except (jwt.InvalidTokenError, Exception) as e:
-        return JsonResponse({"error": f"Invalid token: {str(e)}"}, status=401)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
 
-    doc = festival_collection.find_one({"_id": ObjectId(doc_id)})
+    doc = festival_collection.find_one(
+        {"_id": ObjectId(doc_id)},
+        projection("title", "ai_video_data.en", "ai_voice_data.en.script"),
+    )
 
     # Check if video already exists and is completed
     ai_video_data = doc.get("ai_video_data", {})
@@ -1732,7 +2196,7 @@ def generate_tavus_video(request):
         headers = {"x-api-key": tavus_api_key}
         
         try:
-            response = requests.get(status_url, headers=headers)
+            response = http_client.get("tavus", status_url, headers=headers)
             if response.status_code == 200:
                 status_data = response.json()
                 if status_data.get("status") == "completed" and status_data.get("video_url"):
@@ -1771,59 +2235,74 @@ def generate_tavus_video(request):
         "Content-Type": "application/json"
     }
 
+    # Take one video from the plan's quota, given back if Tavus doesn't start it
+    reservation = reserve(users_collection, ObjectId(user_id), "video", plan)
+    if reservation is None:
+        return JsonResponse({"error": limit_message("video", plan)}, status=403)
+
     # Step 1: Generate video
-    response = requests.post(tavus_url, json=payload, headers=headers)
+    try:
+        response = http_client.post("tavus", tavus_url, json=payload, headers=headers)
+    except requests.exceptions.RequestException as e:
+        reservation.release()
+        return JsonResponse({"error": "Tavus API connection error", "details": str(e)}, status=502)
     if response.status_code != 200:
+        reservation.release()
         return JsonResponse({"error": "Failed to generate video", "details": response.text}, status=500)
     
-    result = response.json()
-    video_id = result.get("video_id")
+    try:
+        result = response.json()
+    except ValueError:
+        reservation.release()
+        return JsonResponse({"error": "Invalid response from Tavus", "details": response.text[:500]}, status=502)
+    video_id = result.get("video_id") if isinstance(result, dict) else None
     if not video_id:
+        reservation.release()
         return JsonResponse({"error": "Failed to get video_id from Tavus", "details": result}, status=500)
 
-    # Increment video usage count after successful video generation request
-    users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$inc": {"video_usage": 1}}
-    )
-
-    # Step 2: Check immediate status
+    # Step 2: Check immediate status. Tavus has started the video (and the unit is spent),
+    # so if the check fails the video is still recorded as processing for later polling.
     status_url = f"https://tavusapi.com/v2/videos/{video_id}"
-    status_response = requests.get(status_url, headers=headers)
-    
-    if status_response.status_code == 200:
-        status_data = status_response.json()
-        video_status = status_data.get("status")
-        
-        if video_status == "completed" and status_data.get("video_url"):
-            # Video is already completed - save actual URL
-            festival_collection.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {
-                    "ai_video_data.en.video_url": status_data.get("video_url"),
-                    "ai_video_data.en.status": "completed",
-                    "ai_video_data.en.video_id": video_id,
-                    "ai_video_data.en.url": f"https://tavus.video/{video_id}"
-                }}
-            )
-            return JsonResponse({"video_url": status_data.get("video_url")})
+    status_data = {}
+    try:
+        status_response = http_client.get("tavus", status_url, headers=headers)
+        if status_response.status_code == 200:
+            status_data = status_response.json()
         else:
-            # Video is still processing - save placeholder
-            festival_collection.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {
-                    "ai_video_data.en.url": f"https://tavus.video/{video_id}",
-                    "ai_video_data.en.status": video_status,
-                    "ai_video_data.en.video_id": video_id
-                }}
-            )
-            return JsonResponse({
-                "status": video_status,
-                "message": "Video is still processing. Please try again later.",
-                "video_id": video_id
-            }, status=202)
-    
-    return JsonResponse({"error": "Failed to check video status"}, status=500)
+            print(f"Tavus status check for {video_id} returned {status_response.status_code}")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Tavus status check for {video_id} failed: {e}")
+    if not isinstance(status_data, dict):
+        status_data = {}
+    video_status = status_data.get("status") or "queued"
+
+    if video_status == "completed" and status_data.get("video_url"):
+        # Video is already completed - save actual URL
+        festival_collection.update_one(
+            {"_id": ObjectId(doc_id)},
+            {"$set": {
+                "ai_video_data.en.video_url": status_data.get("video_url"),
+                "ai_video_data.en.status": "completed",
+                "ai_video_data.en.video_id": video_id,
+                "ai_video_data.en.url": f"https://tavus.video/{video_id}"
+            }}
+        )
+        return JsonResponse({"video_url": status_data.get("video_url")})
+
+    # Video is still processing - save placeholder
+    festival_collection.update_one(
+        {"_id": ObjectId(doc_id)},
+        {"$set": {
+            "ai_video_data.en.url": f"https://tavus.video/{video_id}",
+            "ai_video_data.en.status": video_status,
+            "ai_video_data.en.video_id": video_id
+        }}
+    )
+    return JsonResponse({
+        "status": video_status,
+        "message": "Video is still processing. Please try again later.",
+        "video_id": video_id
+    }, status=202)
 
 @csrf_exempt
 def get_tavus_video(request):
@@ -1836,18 +2315,8 @@ def get_tavus_video(request):
     if not doc_id:
         return JsonResponse({"error": "_id is required"}, status=400)
     
-    # Check authentication (optional for get, but good practice)
-    auth_header = request.headers.get('Authorization', '')
-    if auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-        except:
-            pass  # Continue without user validation for get requests
-    
     # Get video data from database
-    doc = festival_collection.find_one({"_id": ObjectId(doc_id)})
+    doc = festival_collection.find_one({"_id": ObjectId(doc_id)}, projection("ai_video_data.en"))
     if not doc:
         return JsonResponse({"error": "Festival not found"}, status=404)
     
@@ -1871,7 +2340,7 @@ def get_tavus_video(request):
         headers = {"x-api-key": tavus_api_key}
         
         try:
-            response = requests.get(status_url, headers=headers)
+            response = http_client.get("tavus", status_url, headers=headers)
             if response.status_code == 200:
                 status_data = response.json()
                 video_status = status_data.get("status")
@@ -1913,29 +2382,41 @@ def get_tavus_video(request):
         "status": "not_found",
         "message": "No video found for this festival"
     }, status=404)
-def check_subscription_expiry(user):
-    """Check if user's premium subscription has expired and update accordingly"""
-    premium = user.get('premium', {})
-    
-    if premium.get('is_active', False) and premium.get('expires_at'):
-        expires_at = premium['expires_at']
-        
-        # Check if subscription has expired
-        if datetime.utcnow() > expires_at:
-            # Mark as expired
-            users_collection.update_one(
-                {"_id": user["_id"]},
-                {"$set": {
-                    "premium.is_active": False,
-                    "premium.expired": True
-                }}
-            )
-            
-            # Return updated user data
-            user['premium']['is_active'] = False
-            user['premium']['expired'] = True
-    
-    return user
+
+
+def can_read_metrics(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = request.headers.get("X-Metrics-Token", "")
+    return bool(METRICS_TOKEN) and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+
+
+@csrf_exempt
+def service_metrics(request):
+    """
+    Cache, rate-limiter, worker-pool, auth, scraper-timing and outbound HTTP counters for this worker process.
+    Only for staff sessions or requests carrying FESTIFLY_METRICS_TOKEN; anyone else gets a 404.
+    """
+    if not can_read_metrics(request):
+        return JsonResponse({"error": "Not found"}, status=404)
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET method is allowed."}, status=405)
+
+    return JsonResponse({
+        "search_cache": SEARCH_CACHE.stats(),
+        "recommendation_flights": RECOMMENDATION_FLIGHTS.stats(),
+        "stale_while_revalidate": dict(STALE_REFRESH_METRICS),
+        "ai_event_cache": ai_event_cache.stats(),
+        "search_index": festival_search.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": password_pool.stats(),
+        "gemini_pool": gemini_pool.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "scraper_sources": source_timings.stats(),
+        "http": http_client.stats(),
+    })
+
 
 # @csrf_exempt
 # def ask_bot(request):
@@ -12,10 +12,13 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+load_dotenv(BASE_DIR / '.env')
+
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
@@ -52,6 +55,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Bearer JWT -> request.principal (api/auth.py)
+    'api.auth.JWTAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +92,23 @@ DATABASES = {
     }
 }
 
+# MongoDB (see api/db.py): one client per worker process, shared by every view module
+MONGODB = {
+    'URI': os.environ.get('FESTIFLY_MONGODB_URI'),
+    'NAME': os.environ.get('FESTIFLY_MONGODB_DB', 'festifly'),
+    'MAX_POOL_SIZE': int(os.environ.get('FESTIFLY_MONGODB_MAX_POOL_SIZE', 50)),
+    'MIN_POOL_SIZE': int(os.environ.get('FESTIFLY_MONGODB_MIN_POOL_SIZE', 0)),
+    'MAX_IDLE_TIME_MS': int(os.environ.get('FESTIFLY_MONGODB_MAX_IDLE_TIME_MS', 60000)),
+    'WAIT_QUEUE_TIMEOUT_MS': int(os.environ.get('FESTIFLY_MONGODB_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+    'CONNECT_TIMEOUT_MS': int(os.environ.get('FESTIFLY_MONGODB_CONNECT_TIMEOUT_MS', 5000)),
+    'SERVER_SELECTION_TIMEOUT_MS': int(os.environ.get('FESTIFLY_MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'SOCKET_TIMEOUT_MS': int(os.environ.get('FESTIFLY_MONGODB_SOCKET_TIMEOUT_MS', 30000)),
+    'READ_PREFERENCE': os.environ.get('FESTIFLY_MONGODB_READ_PREFERENCE', 'primary'),
+    'READ_CONCERN': os.environ.get('FESTIFLY_MONGODB_READ_CONCERN', 'local'),
+    'WRITE_CONCERN': os.environ.get('FESTIFLY_MONGODB_WRITE_CONCERN', 'majority'),
+    'RETRY_WRITES': os.environ.get('FESTIFLY_MONGODB_RETRY_WRITES', 'true').lower() == 'true',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -129,4 +151,18 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+# Application loggers ("api.*") write to the console; FESTIFLY_LOG_LEVEL=DEBUG for more
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.environ.get('FESTIFLY_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
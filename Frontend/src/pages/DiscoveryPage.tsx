@@ -27,6 +27,9 @@ interface FilterState {
   sortBy: 'relevance' | 'upvotes' | 'vibe' | 'recent';
 }
 
+// Festivals per request to the listing endpoint
+const FESTIVALS_PAGE_SIZE = 100;
+
 interface UserData {
   user_id: string;
   username: string;
@@ -49,6 +52,9 @@ const DiscoveryPage = () => {
   const [loadingPremiumStatus, setLoadingPremiumStatus] = useState(false);
   const itemsPerPage = 12;
   const [currentPage, setCurrentPage] = useState(1);
+  // Cursor of the next page of the festival listing; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [filters, setFilters] = useState<FilterState>({
     search: '',
@@ -152,33 +158,56 @@ const DiscoveryPage = () => {
   useEffect(() => {
     if (results && Array.isArray(results)) {
       setFestivals(results);
+      setNextCursor(null);
       setLoading(false);
     } else {
       fetchFestivals();
     }
   }, [results]);
 
+  const fetchFestivalsPage = async (cursor: string | null) => {
+    const url = new URL('http://127.0.0.1:8000/api/get-all-festivals/');
+    url.searchParams.set('limit', String(FESTIVALS_PAGE_SIZE));
+    if (cursor) url.searchParams.set('after', cursor);
+    const response = await fetch(url.toString());
+    if (!response.ok) throw new Error('Failed to fetch festivals');
+    const data = await response.json();
+    return {
+      festivals: Array.isArray(data.festivals) ? data.festivals as Festival[] : [],
+      nextCursor: (data.next_cursor as string | null) || null,
+    };
+  };
+
+  // The listing is paginated: load the first page now, the rest on demand
   const fetchFestivals = async () => {
     setLoading(true);
     try {
-      const response = await fetch('http://127.0.0.1:8000/api/get-all-festivals');
-      if (!response.ok) throw new Error('Failed to fetch festivals');
-      const data = await response.json();
-      if (Array.isArray(data)) {
-        setFestivals(data);
-      } else if (Array.isArray(data.festivals)) {
-        setFestivals(data.festivals);
-      } else {
-        setFestivals([]);
-      }
+      const page = await fetchFestivalsPage(null);
+      setFestivals(page.festivals);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error fetching festivals:', error);
       setFestivals([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMoreFestivals = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchFestivalsPage(nextCursor);
+      setFestivals((prev) => [...prev, ...page.festivals]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading more festivals:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Fetch personalized festivals based on user preferences
   const fetchPersonalizedFestivals = async () => {
     // Check if user is authenticated
@@ -218,6 +247,7 @@ const DiscoveryPage = () => {
 
       if (data.festivals && Array.isArray(data.festivals)) {
         setFestivals(data.festivals);
+        setNextCursor(null);
         setPersonalizedError(null);
       } else if (data.message) {
         setPersonalizedError(data.message);
@@ -1283,6 +1313,20 @@ const DiscoveryPage = () => {
           </div>
         )}
 
+        {/* Load more - the listing is fetched a page at a time */}
+        {nextCursor && (
+          <div className="flex justify-center mt-4 sm:mt-6">
+            <button
+              onClick={loadMoreFestivals}
+              disabled={loadingMore}
+              className={`w-full sm:w-auto px-6 py-2 rounded-lg font-medium text-sm flex items-center justify-center space-x-2 ${loadingMore ? 'bg-gray-700 text-gray-400 cursor-not-allowed' : 'bg-purple-600/80 text-white hover:bg-purple-600'}`}
+            >
+              {loadingMore && <Loader className="h-4 w-4 animate-spin" />}
+              <span>{loadingMore ? 'Loading...' : 'Load more festivals'}</span>
+            </button>
+          </div>
+        )}
+
         {/* No Results - Responsive */}
         {filteredAndSortedFestivals.length === 0 && (
           <div className="text-center py-8 sm:py-12">